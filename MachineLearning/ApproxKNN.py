@@ -0,0 +1,61 @@
+import os
+import hashlib
+import numpy as np
+from FeatureCache import CACHE_DIR
+
+#Approximate nearest neighbours classifier on a HNSW graph (hnswlib), a drop-in for KNeighborsClassifier's fit/predict.
+#ef is the recall/speed knob of the queries (neighbours explored per query, at least n_neighbors),
+#M and ef_construction shape the graph. The index is saved under INDEX_DIR keyed by the training data and graph
+#parameters, so the benchmarks and the serving process reload it instead of rebuilding it.
+INDEX_DIR = os.path.join(CACHE_DIR, "hnsw")
+
+
+class HNSWKNeighborsClassifier(object):
+    def __init__(self, n_neighbors=5, ef=50, M=16, ef_construction=200, n_jobs=-1, indexDir=INDEX_DIR, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.ef = ef
+        self.M = M
+        self.ef_construction = ef_construction
+        self.n_jobs = n_jobs
+        self.indexDir = indexDir
+        self.random_state = random_state
+
+    def index_path(self, X, y):
+        digest = hashlib.sha256(np.ascontiguousarray(X).tobytes())
+        digest.update(np.ascontiguousarray(y).tobytes())
+        digest.update(f"{self.M}-{self.ef_construction}-{self.random_state}".encode())
+        return os.path.join(self.indexDir, f"{digest.hexdigest()[:16]}.bin")
+
+    def fit(self, X, y):
+        import hnswlib
+        X = np.asarray(X, dtype=np.float32)
+        self.labels_ = np.asarray(y)
+        self.classes_ = np.unique(self.labels_)
+        self.index_ = hnswlib.Index(space="l2", dim=X.shape[1])
+
+        path = self.index_path(X, self.labels_) if self.indexDir is not None else None
+        if path is not None and os.path.exists(path):
+            self.index_.load_index(path, max_elements=len(X))
+        else:
+            self.index_.init_index(max_elements=len(X), M=self.M, ef_construction=self.ef_construction, random_seed=self.random_state)
+            self.index_.add_items(X, np.arange(len(X)), num_threads=self.n_jobs)
+            if path is not None:
+                os.makedirs(self.indexDir, exist_ok=True)
+                tmpPath = f"{path}.tmp{os.getpid()}"
+                self.index_.save_index(tmpPath)
+                os.replace(tmpPath, path)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        n_neighbors = n_neighbors or self.n_neighbors
+        self.index_.set_ef(max(self.ef, n_neighbors))
+        ids, distances = self.index_.knn_query(np.asarray(X, dtype=np.float32), k=n_neighbors, num_threads=self.n_jobs)
+        return np.sqrt(distances), ids.astype(np.int64)
+
+    #majority vote of the neighbours (the uniform weights of KNeighborsClassifier), ties to the lowest class
+    def predict(self, X):
+        _, ids = self.kneighbors(X)
+        neighbourClasses = np.searchsorted(self.classes_, self.labels_[ids])
+        votes = np.zeros((len(ids), len(self.classes_)), dtype=np.int32)
+        np.add.at(votes, (np.repeat(np.arange(len(ids)), ids.shape[1]), neighbourClasses.ravel()), 1)
+        return self.classes_[votes.argmax(axis=1)]
@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import platform as sysPlatform
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
+from sklearn.metrics import accuracy_score,classification_report
+from FeatureCache import load_features
+
+#One harness for the CPU/GPU model comparison: every model is fitted and predicted WARMUP times untimed,
+#then TRIALS times with perf_counter. The results keep the samples, their median and a bootstrap confidence
+#interval of the median, with the peak RSS and CPU count of the run, in the SCHEMA_VERSION layout read by DashBoard.
+SCHEMA_VERSION = 2
+BENCH_DIR = "JSONS"
+TRIALS = 5
+WARMUP = 1
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 1000
+
+
+#a backend loads the (XTrain, XTest, yTrain, yTest, classes) data once and gives (name, model factory) pairs,
+#the factories take the thread budget of the job (None keeps every core), toNumpy brings predictions and labels
+#back to host arrays for the metrics. Backends are pickled to the scheduler processes, so they only hold plain settings.
+class SklearnBackend(object):
+    name = "sklearn"
+
+    def available(self):
+        return True
+
+    def load(self):
+        return load_features()
+
+    def models(self):
+        from sklearn.svm import SVC
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.neighbors import KNeighborsClassifier
+        from sklearn.linear_model import LogisticRegression
+        return [("SVM",lambda threads: SVC(class_weight="balanced",random_state=42)),
+                ("RandForest",lambda threads: RandomForestClassifier(class_weight="balanced", n_jobs=threads or -1,random_state=42)),
+                ("KNN",lambda threads: KNeighborsClassifier(n_jobs=threads or -1)),
+                ("LR",lambda threads: LogisticRegression(class_weight="balanced",penalty=None,n_jobs=threads or -1,max_iter=1000))]
+
+    def toNumpy(self, values):
+        return np.asarray(values)
+
+
+class XGBoostBackend(SklearnBackend):
+    name = "xgboost"
+
+    def __init__(self, tree_method="hist"):
+        self.tree_method = tree_method
+
+    def available(self):
+        try:
+            import xgboost
+        except ImportError:
+            return False
+        return True
+
+    def models(self):
+        from xgboost import XGBClassifier
+        return [("XGBoost6",lambda threads: XGBClassifier(seed=42, tree_method=self.tree_method, n_jobs=threads)),
+                ("XGBoost10",lambda threads: XGBClassifier(seed=42, max_depth=10, tree_method=self.tree_method, n_jobs=threads))]
+
+
+#approximations of the exact SVC (rbf kernel, balanced classes): the kernel map of a Nystroem sample or of random
+#Fourier features fed to a linear SVM, and a bagged ensemble of SVCs each fitted on a fraction of the rows
+class ScalableSVMBackend(SklearnBackend):
+    name = "svm_approx"
+
+    def __init__(self, nComponents=1000, nEstimators=10, maxSamples=0.1):
+        self.nComponents = nComponents
+        self.nEstimators = nEstimators
+        self.maxSamples = maxSamples
+
+    def models(self):
+        from sklearn.svm import SVC, LinearSVC
+        from sklearn.pipeline import make_pipeline
+        from sklearn.kernel_approximation import Nystroem, RBFSampler
+        from sklearn.ensemble import BaggingClassifier
+        #Nystroem's default gamma (1/n_features) equals the gamma="scale" of the exact SVC on standardized features
+        linear = lambda: LinearSVC(class_weight="balanced", dual=False, random_state=42)
+        return [("SVMNystroem",lambda threads: make_pipeline(Nystroem(n_components=self.nComponents, random_state=42), linear())),
+                ("SVMRBFSampler",lambda threads: make_pipeline(RBFSampler(n_components=self.nComponents, gamma="scale", random_state=42), linear())),
+                ("SVMBagged",lambda threads: BaggingClassifier(SVC(class_weight="balanced"), n_estimators=self.nEstimators, max_samples=self.maxSamples,
+                                                               n_jobs=threads or -1, random_state=42))]
+
+
+#HNSW approximate KNN at several query ef, after the first (warmup) fit the index is loaded from its file,
+#so the train times are index loads, benchKNN.py reports the build separately
+class ApproxKNNBackend(SklearnBackend):
+    name = "approx_knn"
+
+    def __init__(self, efs=(10,50,200)):
+        self.efs = efs
+
+    def available(self):
+        try:
+            import hnswlib
+        except ImportError:
+            return False
+        return True
+
+    def models(self):
+        from ApproxKNN import HNSWKNeighborsClassifier
+        return [(f"KNNHNSW{ef}",lambda threads, ef=ef: HNSWKNeighborsClassifier(ef=ef, n_jobs=threads or -1)) for ef in self.efs]
+
+
+class CuMLBackend(object):
+    name = "cuml"
+
+    def available(self):
+        try:
+            import cuml
+            import cudf
+        except ImportError:
+            return False
+        return True
+
+    def load(self):
+        import cudf
+        from cuml.preprocessing import StandardScaler
+        from cuml.preprocessing.LabelEncoder import LabelEncoder
+        from DataSet import dataset_path
+
+        XTrain = cudf.read_parquet(dataset_path("trainSplit"))
+        XTest = cudf.read_parquet(dataset_path("testSplit"))
+        yTrain = XTrain.pop("Tier")
+        yTest = XTest.pop("Tier")
+
+        standard_scaler = StandardScaler()
+        XTrain = standard_scaler.fit_transform(XTrain)
+        XTest = standard_scaler.transform(XTest)
+
+        label_encoder = LabelEncoder()
+        label_encoder.fit(yTrain)
+        yTrain = label_encoder.transform(yTrain.to_numpy())
+        yTest = label_encoder.transform(yTest.to_numpy())
+        return XTrain, XTest, yTrain, yTest, self.toNumpy(label_encoder.classes_).astype(str)
+
+    def models(self):
+        from cuml import SVC,LogisticRegression
+        from cuml.ensemble import RandomForestClassifier
+        from cuml.neighbors import KNeighborsClassifier
+        return [("SVM",lambda threads: SVC(class_weight="balanced",random_state=42)),
+                ("RandForest",lambda threads: RandomForestClassifier(random_state=42)),
+                ("KNN",lambda threads: KNeighborsClassifier()),
+                ("LR",lambda threads: LogisticRegression(penalty="none",class_weight="balanced",max_iter=1000,linesearch_max_iter=1000))]
+
+    def toNumpy(self, values):
+        return values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+
+
+BACKENDS = {x.name:x for x in [SklearnBackend, XGBoostBackend, ScalableSVMBackend, ApproxKNNBackend, CuMLBackend]}
+
+
+#peak RSS since the last reset_peak_rss. On Linux it is VmHWM: ru_maxrss is kept across fork and exec, so a
+#worker started from a large parent would report the parent's peak. Elsewhere ru_maxrss of the whole process
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    #kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+
+#VmHWM back to the current RSS (Linux 4.0+), a no-op where it can't be reset
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def cpu_count():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+
+#median, mean, std and a bootstrap confidence interval of the median
+def summarize(samples, confidence=CONFIDENCE, resamples=BOOTSTRAP_RESAMPLES, seed=42):
+    samples = np.asarray(samples, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    medians = np.median(rng.choice(samples, (resamples, len(samples))), axis=1)
+    low, high = np.quantile(medians, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return {
+        "median": float(np.median(samples)),
+        "mean": float(samples.mean()),
+        "std": float(samples.std(ddof=1)) if len(samples) > 1 else 0.0,
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "confidence": confidence,
+        "samples": samples.tolist(),
+    }
+
+
+#warmup + trials fits and predictions of fresh models, timeBudget (seconds) stops the trials early (at least one is kept)
+def time_model(factory, XTrain, XTest, yTrain, trials=TRIALS, warmup=WARMUP, timeBudget=None, threads=None):
+    trainTimes = []
+    predictTimes = []
+    spent = 0.0
+    for trial in range(warmup + trials):
+        model = factory(threads)
+        start = time.perf_counter()
+        model.fit(XTrain, yTrain)
+        trained = time.perf_counter()
+        yPred = model.predict(XTest)
+        stop = time.perf_counter()
+
+        spent += stop - start
+        if trial >= warmup:
+            trainTimes.append(trained - start)
+            predictTimes.append(stop - trained)
+            if timeBudget is not None and spent >= timeBudget:
+                break
+    return trainTimes, predictTimes, yPred
+
+
+def write_result(values, path):
+    tmpPath = f"{path}.tmp"
+    with open(tmpPath, "w") as json_file:
+        json.dump(values, json_file)
+    os.replace(tmpPath, path)
+
+
+#extra fields (search parameters...) are added to the results file
+def benchmark_model(backend, name, factory, data, platform, outDir, trials=TRIALS, warmup=WARMUP, timeBudget=None, threads=None, workers=1, extra=None):
+    XTrain, XTest, yTrain, yTest, classes = data
+    yTrue = backend.toNumpy(yTest)
+    reset_peak_rss()
+    #BLAS/OpenMP pools of numpy, scipy and the estimators capped to the job budget
+    with threadpool_limits(limits=threads):
+        trainTimes, predictTimes, yPred = time_model(factory, XTrain, XTest, yTrain, trials, warmup, timeBudget, threads)
+    yPred = backend.toNumpy(yPred)
+
+    values = {
+        "schema_version": SCHEMA_VERSION,
+        "model": name,
+        "platform": platform,
+        "backend": backend.name,
+        "trials": len(trainTimes),
+        "warmup": warmup,
+        "train_time": summarize(trainTimes),
+        "predict_time": summarize(predictTimes),
+        "peak_rss_mb": peak_rss_mb(),
+        "cpu_count": cpu_count(),
+        "threads": threads,
+        "workers": workers,
+        "host": sysPlatform.node(),
+        "metrics": classification_report(yTrue, yPred, output_dict=True,target_names=classes, labels=list(range(len(classes)))),
+        "accuracy": accuracy_score(yTrue, yPred),
+    } | (extra or {})
+    write_result(values, os.path.join(outDir, f"{name}_{platform}.json"))
+    print(f"{name}  train {values['train_time']['median']:.3f}s [{values['train_time']['ci_low']:.3f}, {values['train_time']['ci_high']:.3f}]"
+          f"  predict {values['predict_time']['median']:.3f}s  peak RSS {values['peak_rss_mb']:.0f} MiB")
+    return values
+
+
+#one model in a scheduler process, the data is opened again there (memory-mapped for the CPU backends)
+def run_job(backend, name, platform, outDir, trials, warmup, timeBudget, threads, workers):
+    factory = dict(backend.models())[name]
+    return benchmark_model(backend, name, factory, backend.load(), platform, outDir, trials, warmup, timeBudget, threads, workers)
+
+
+#median train time of the previous results, so the longest jobs are started first
+def previous_time(name, platform, outDir):
+    try:
+        with open(os.path.join(outDir, f"{name}_{platform}.json")) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return 0.0
+    if data.get("schema_version", 1) >= 2:
+        return data["train_time"]["median"]
+    return data["train_time"]["stop"] - data["train_time"]["start"]
+
+
+#runs every model of the backends and writes {model}_{platform}.json to outDir, models limits them by name.
+#With workers > 1 the models are fitted in a process pool, each job capped to threadsPerJob threads
+#(cpu_count() // workers by default) so n_jobs and the XGBoost threads don't oversubscribe the cores
+def run_benchmark(backends, platform, outDir=BENCH_DIR, trials=TRIALS, warmup=WARMUP, timeBudget=None, models=None, workers=1, threadsPerJob=None):
+    os.makedirs(outDir, exist_ok=True)
+    results = {}
+    jobs = []
+    for backend in backends:
+        if not backend.available():
+            print(f"{backend.name} not available, skipped")
+            continue
+        jobs += [(backend, name, factory) for name,factory in backend.models() if models is None or name in models]
+
+    if workers <= 1:
+        data = {}
+        for backend,name,factory in jobs:
+            if backend.name not in data:
+                data[backend.name] = backend.load()
+            results[name] = benchmark_model(backend, name, factory, data[backend.name], platform, outDir, trials, warmup, timeBudget, threadsPerJob)
+        return results
+
+    threadsPerJob = threadsPerJob or max(cpu_count() // workers, 1)
+    jobs.sort(key=lambda x: -previous_time(x[1], platform, outDir))
+    #a fresh process per model, so a worker never reports the peak of its earlier jobs where reset_peak_rss
+    #can't reset it (spawned, so the calling script needs a __main__ guard)
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as executor:
+        futures = {executor.submit(run_job, backend, name, platform, outDir, trials, warmup, timeBudget, threadsPerJob, workers):name for backend,name,_ in jobs}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
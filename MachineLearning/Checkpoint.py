@@ -0,0 +1,63 @@
+import os
+import pandas as pd
+
+#Chunked output with a done-list, so a long aggregation can resume after a crash.
+#The done file holds one summoner id per line, and after every finished chunk a marker line
+#"# <partial csv size> <rows written>". Ids after the last marker belong to a chunk that never finished.
+
+
+def load_checkpoint(partialPath, donePath):
+    doneIds = set()
+    pending = []
+    partialSize = 0
+    rowsWritten = 0
+    doneSize = 0
+
+    if os.path.exists(donePath):
+        with open(donePath, "rb") as f:
+            for line in f:
+                line = line.decode().rstrip("\n")
+                if line.startswith("# "):
+                    _, partialSize, rowsWritten = line.split(" ")
+                    partialSize, rowsWritten = int(partialSize), int(rowsWritten)
+                    doneIds.update(pending)
+                    pending = []
+                    doneSize = f.tell()
+                elif line:
+                    pending.append(line)
+
+        #drop what an interrupted chunk left behind
+        os.truncate(donePath, doneSize)
+
+    if os.path.exists(partialPath):
+        os.truncate(partialPath, partialSize)
+
+    return doneIds, rowsWritten
+
+
+def write_checkpoint_chunk(rows, columns, chunkIds, partialPath, donePath, rowsWritten):
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df.index = range(rowsWritten, rowsWritten + len(df.index))
+
+    with open(partialPath, "a", newline="") as f:
+        df.to_csv(f, header=f.tell() == 0)
+        f.flush()
+        os.fsync(f.fileno())
+        partialSize = f.tell()
+
+    rowsWritten += len(df.index)
+    with open(donePath, "a") as f:
+        f.writelines(f"{x}\n" for x in chunkIds)
+        f.write(f"# {partialSize} {rowsWritten}\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    return rowsWritten
+
+
+def finish_checkpoint(partialPath, donePath, outputPath, columns):
+    if not os.path.exists(partialPath):
+        pd.DataFrame(columns=columns).to_csv(partialPath)
+    os.replace(partialPath, outputPath)
+    if os.path.exists(donePath):
+        os.remove(donePath)
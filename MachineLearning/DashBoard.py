@@ -1,16 +1,22 @@
+import os
+import sys
+import time
+import json
+import threading
+import warnings
+from datetime import datetime
 import pandas as pd
 import numpy as np
-from opensearchpy import OpenSearch
 from dotenv import load_dotenv
-import os
-import warnings
+from dash import Dash, html, dcc, callback, Output, Input
+import plotly.express as px
+import plotly.graph_objects as go
+import dash_mantine_components as dmc
+import dash_bootstrap_components as dbc
 from QueryBuilders import MatchQueryBuilder, MatchPlayerSubQueryBuilder, MatchTeamSubQueryBuilder
-from datetime import datetime
+from QueryCache import QueryCache, normalize_key
 from constantsQueues import queueConstants
-import dash_bootstrap_components as dbc
-import time
-from PIL import Image
-import json
+from DataSet import TIERS
 
 warnings.filterwarnings('ignore')
 
@@ -19,7 +25,34 @@ CLUSTER_URL = 'https://localhost:9200'
 USNAME = os.getenv('USERNM')
 PASSWD = os.getenv('PASSWORD')
 
+#update_graph results per filter combination, QUERY_CACHE_DIR shares them between worker processes
+QUERY_CACHE_SIZE = 128
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_DIR = os.getenv('QUERY_CACHE_DIR')
+
+#dropdown options are served from this file at startup and refreshed in the background every METADATA_REFRESH seconds
+METADATA_CACHE_PATH = os.path.join("csv","cache",f"metadata_{os.getenv('DASH_BACKEND', 'opensearch')}.json")
+METADATA_REFRESH = 3600
+
+#"histogram": total gold/exp per match are summed by a script and binned by OpenSearch, only the bin counts come back
+#"buckets": one terms bucket per match _id, binned by plotly
+#"rollup": histogram over the precomputed per-match team totals of the MatchRollup.py index
+TOTALS_MODE = "histogram"
+ROLLUP_MATCHES_INDEX = "matches_rollup"
+TOTAL_GOLD_INTERVAL = 2000
+TOTAL_EXP_INTERVAL = 2500
+
+#championPick/championFirstBlood (and the "buckets" totals) as composite aggregations paged with after_key,
+#complete for any number of champions instead of the top 40 terms
+COMPOSITE_QUERIES = True
+COMPOSITE_PAGE_SIZE = 1000
+
+#"opensearch" queries the matches index, "duckdb" the local Parquet snapshot of MatchRollup.py in ROLLUP_DIR
+DASH_BACKEND = os.getenv('DASH_BACKEND', 'opensearch')
+ROLLUP_DIR = os.path.join("csv", "rollup")
+
 def get_os_client(cluster_url, username, password):
+    from opensearchpy import OpenSearch
     client = OpenSearch(
         hosts=[cluster_url],
         http_auth=(username, password),
@@ -27,8 +60,6 @@ def get_os_client(cluster_url, username, password):
     )
     return client
 
-client = get_os_client(CLUSTER_URL,USNAME,PASSWD)
-
 championFirstBlood = {
     "filter": {
         "term":{
@@ -235,6 +266,117 @@ def total_exp_build(teams=None,win=None,qSize=10000):
     return total_exp
 
 
+#per match sum of a participants field (with the same team/win filters) fed to a histogram,
+#the sampler keeps the qSize (per shard) bound of the buckets mode
+TOTAL_SCRIPT = """
+double total = 0;
+for (def p : params._source.info.participants) {
+    if ((params.win == null || p.win == params.win) && (params.teams == null || params.teams.contains(p.teamId))) {
+        def v = p[params.field];
+        if (v != null) {
+            total += v;
+        }
+    }
+}
+return total;
+"""
+
+def total_histogram_build(field,interval,teams=None,win=None,qSize=10000):
+    total_hist = {
+        "sampler": {
+            "shard_size": qSize
+        },
+        "aggs":{
+            "totals":{
+                "histogram": {
+                    "script": {
+                        "source": TOTAL_SCRIPT,
+                        "params": {"field": field, "teams": teams, "win": win}
+                    },
+                    "interval": interval,
+                    "min_doc_count": 1
+                }
+            }
+        }
+    }
+    return total_hist
+
+
+ROLLUP_TOTAL_SCRIPT = """
+double total = 0;
+for (def teamId : params.teams) {
+    if (params.win == null || doc['win' + teamId].value == params.win) {
+        total += doc[params.field + teamId].value;
+    }
+}
+return total;
+"""
+
+def rollup_filters(gameMode=None,qType=None,dateRange=None,platformId=None):
+    filters = []
+    if gameMode is not None:
+        filters.append({"terms":{"gameMode": gameMode}})
+    if qType is not None:
+        filters.append({"terms":{"queueId": qType}})
+    if dateRange is not None:
+        filters.append({"range": {"gameCreation": {"gte": dateRange[0],"lte": dateRange[1]}}})
+    if platformId is not None:
+        filters.append({"terms":{"platformId": platformId}})
+    return {"bool":{"filter":filters}}
+
+def runRollupTotals(client,totals,teamId=None,playerWinner=None,gameMode=None,qType=None,dateRange=None,platformId=None):
+    aggs = {}
+    for name,field,interval in [("total_gold","gold",TOTAL_GOLD_INTERVAL),("total_exp","exp",TOTAL_EXP_INTERVAL)]:
+        if name in totals:
+            aggs[name] = {
+                "histogram": {
+                    "script": {
+                        "source": ROLLUP_TOTAL_SCRIPT,
+                        "params": {"field": field, "teams": teamId or [100,200], "win": playerWinner}
+                    },
+                    "interval": interval,
+                    "min_doc_count": 1
+                }
+            }
+    response = client.search(index=ROLLUP_MATCHES_INDEX, body={"size":0,"query":rollup_filters(gameMode,qType,dateRange,platformId),"aggs":aggs})
+    return {name:getQueryResBuckets(response["aggregations"][name],"buckets",["doc_count"]) for name in aggs}
+
+
+#participants grouped by champion and by the player filter fields, the filters are applied to the keys of each page
+CHAMPION_SOURCES = [
+    {"champion": {"terms": {"field": "info.participants.championName.keyword"}}},
+    {"win": {"terms": {"field": "info.participants.win", "missing_bucket": True}}},
+    {"team": {"terms": {"field": "info.participants.teamId", "missing_bucket": True}}},
+    {"firstBlood": {"terms": {"field": "info.participants.firstBloodKill", "missing_bucket": True}}},
+]
+
+def compositeFlag(value):
+    return value in (True, 1, "true")
+
+def championCounts(pages,win=None,teams=None):
+    picks = {}
+    firstBloods = {}
+    for buckets in pages:
+        for bucket in buckets:
+            key = bucket["key"]
+            if win is not None and compositeFlag(key["win"]) != win:
+                continue
+            if teams is not None and key["team"] not in teams:
+                continue
+            picks[key["champion"]] = picks.get(key["champion"], 0) + bucket["doc_count"]
+            if compositeFlag(key["firstBlood"]):
+                firstBloods[key["champion"]] = firstBloods.get(key["champion"], 0) + bucket["doc_count"]
+    byCount = lambda counts: dict(sorted(counts.items(), key=lambda x: -x[1]))
+    return {"championPick": byCount(picks), "championFirstBlood": byCount(firstBloods)}
+
+def compositeTotals(pages):
+    result = {}
+    for buckets in pages:
+        for bucket in buckets:
+            result[bucket["key"]["match"]] = bucket["players"]["winner"]["team"]["total_agg"]["value"]
+    return result
+
+
 def getQueryResBuckets(dictVal,starterPoint,keyOrder):
     result = {}
     for stackRef in dictVal[starterPoint]:
@@ -247,7 +389,7 @@ def getQueryResBuckets(dictVal,starterPoint,keyOrder):
 
 
 
-def runQuery(client,teamWinner=None,teamId=None,playerWinner=None,playerTeamId=None,gameMode=None,qType=None,dateRange=None,platformId=None,qSize=10000,dateAggs=None):
+def runQuery(client,queries=None,teamWinner=None,teamId=None,playerWinner=None,playerTeamId=None,gameMode=None,qType=None,dateRange=None,platformId=None,qSize=10000,dateAggs=None):
     
     queryTeamBuilder = MatchTeamSubQueryBuilder()
     queryTeamBuilder.setWinner(teamWinner)
@@ -261,9 +403,10 @@ def runQuery(client,teamWinner=None,teamId=None,playerWinner=None,playerTeamId=N
     queryPlayerBuilder = MatchPlayerSubQueryBuilder()
     queryPlayerBuilder.setWinner(playerWinner)
     queryPlayerBuilder.setTeam(playerTeamId)
-    queryPlayerBuilder.addQuery("championFirstBlood",championFirstBlood,["countResA"])
+    if not COMPOSITE_QUERIES:
+        queryPlayerBuilder.addQuery("championFirstBlood",championFirstBlood,["countResA"])
+        queryPlayerBuilder.addQuery("championPick",championPick,[])
     queryPlayerBuilder.addQuery("teamFirstBlood",teamFirstBlood,["countResB"])
-    queryPlayerBuilder.addQuery("championPick",championPick,[])
 
     queryBuilder = MatchQueryBuilder(queryPlayerBuilder,queryTeamBuilder)
     queryBuilder.setGameMode(gameMode)
@@ -271,13 +414,42 @@ def runQuery(client,teamWinner=None,teamId=None,playerWinner=None,playerTeamId=N
     queryBuilder.setDate(dateRange)
     queryBuilder.setPlatformId(platformId)
     queryBuilder.addQuery("avgDuration",avgDuration(dateAggs),[])
-    queryBuilder.addQuery("total_gold",total_gold_build(teams=teamId,win=playerWinner,qSize=qSize),[])
-    queryBuilder.addQuery("total_exp",total_exp_build(teams=teamId,win=playerWinner,qSize=qSize),[])
-    aggregation_query = queryBuilder.buildQuery()
+
+    #results read apart from the main aggregation query
+    finalExtra = {}
+    extraNames = []
+    if COMPOSITE_QUERIES:
+        extraNames += ["championPick","championFirstBlood"]
+        if any(queries is None or x in queries for x in extraNames):
+            queryBuilder.addCompositeQuery("champions",CHAMPION_SOURCES,path="info.participants",pageSize=COMPOSITE_PAGE_SIZE)
+            finalExtra |= {x:y for x,y in championCounts(queryBuilder.compositePages(client,"champions"),playerWinner,playerTeamId).items() if queries is None or x in queries}
+
+    if TOTALS_MODE == "rollup":
+        totals = [x for x in ["total_gold","total_exp"] if queries is None or x in queries]
+        extraNames += ["total_gold","total_exp"]
+        if len(totals) > 0:
+            finalExtra |= runRollupTotals(client,totals,teamId=teamId,playerWinner=playerWinner,gameMode=gameMode,qType=qType,dateRange=dateRange,platformId=platformId)
+    elif TOTALS_MODE == "histogram":
+        queryBuilder.addQuery("total_gold",total_histogram_build("goldEarned",TOTAL_GOLD_INTERVAL,teams=teamId,win=playerWinner,qSize=qSize),["totals"])
+        queryBuilder.addQuery("total_exp",total_histogram_build("champExperience",TOTAL_EXP_INTERVAL,teams=teamId,win=playerWinner,qSize=qSize),["totals"])
+    elif COMPOSITE_QUERIES:
+        #one composite bucket per match _id, paged up to qSize matches
+        extraNames += ["total_gold","total_exp"]
+        for name,build in [("total_gold",total_gold_build),("total_exp",total_exp_build)]:
+            if queries is None or name in queries:
+                queryBuilder.addCompositeQuery(name,[{"match":{"terms":{"field":"_id"}}}],aggs=build(teams=teamId,win=playerWinner)["aggs"],pageSize=COMPOSITE_PAGE_SIZE)
+                finalExtra[name] = compositeTotals(queryBuilder.compositePages(client,name,maxBuckets=qSize))
+    else:
+        queryBuilder.addQuery("total_gold",total_gold_build(teams=teamId,win=playerWinner,qSize=qSize),[])
+        queryBuilder.addQuery("total_exp",total_exp_build(teams=teamId,win=playerWinner,qSize=qSize),[])
+
+    if queries is not None and all(x in extraNames for x in queries):
+        return finalExtra
+    aggregation_query = queryBuilder.buildQuery(queries)
 
     #print(aggregation_query)
     response = client.search(index="matches", body=aggregation_query)
-    result = queryBuilder.parseQueryResult(response)
+    result = queryBuilder.parseQueryResult(response,queries)
     
     #print(result["total_gold"])
 
@@ -285,174 +457,157 @@ def runQuery(client,teamWinner=None,teamId=None,playerWinner=None,playerTeamId=N
     finalVals = {x:getQueryResBuckets(result[x],"buckets",["doc_count"]) for x in result if not x.startswith("avg")}
     finalValsAvg = {x:getQueryResBuckets(result[x],"buckets",["avgCount","avg"]) for x in result if x.startswith("avg")}
     finalValsStd = {x + "_std":getQueryResBuckets(result[x],"buckets",["avgCount","std_deviation"]) for x in result if x.startswith("avg")}
-    finalTotal = {x:getQueryResBuckets(result[x],"buckets",["players","winner","team","total_agg","value"]) for x in result if x.startswith("total_")}
+    finalTotal = {x:getQueryResBuckets(result[x],"buckets",["players","winner","team","total_agg","value"]) for x in result if x.startswith("total_") and TOTALS_MODE == "buckets"}
 
-    finalDict = finalVals | finalValsAvg | finalValsStd | finalTotal
+    finalDict = finalVals | finalValsAvg | finalValsStd | finalTotal | finalExtra
 
     return finalDict
 
 
-def getPandas(client,**queryArgs):
+#(key column, value column) of the two column frames built from each query result
+PANDAS_COLUMNS = {
+    "championFirstBlood": ("Champion","Counts"),
+    "championPick": ("Champion","Counts"),
+    "teamWins": ("Team Id","Counts"),
+    "teamFirstBlood": ("Team Id","Counts"),
+    "avgBarons": ("Team Id","Average"),
+    "avgDragon": ("Team Id","Average"),
+    "avgTower": ("Team Id","Average"),
+    "avgKills": ("Team Id","Average"),
+    "total_gold": ("Total","Matches"),
+    "total_exp": ("Total","Matches"),
+}
+
+def getPandas(backend,queries=None,**queryArgs):
     pandasRes = {}
-    dictVal = runQuery(client,**queryArgs)
-    champs = []
-    vals = []
-    for x,y in dictVal['championFirstBlood'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['championFirstBlood'] = pd.DataFrame.from_dict({"Champion": champs, "Counts": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal['championPick'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['championPick'] = pd.DataFrame.from_dict({"Champion": champs, "Counts": vals})
-    
-    champs = []
-    vals = []
-    for x,y in dictVal['teamWins'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['teamWins'] = pd.DataFrame.from_dict({"Team Id": champs, "Counts": vals})
-    
-    champs = []
-    vals = []
-    for x,y in dictVal['teamFirstBlood'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['teamFirstBlood'] = pd.DataFrame.from_dict({"Team Id": champs, "Counts": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal['avgBarons'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['avgBarons'] = pd.DataFrame.from_dict({"Team Id": champs, "Average": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal['avgDragon'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['avgDragon'] = pd.DataFrame.from_dict({"Team Id": champs, "Average": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal['avgTower'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['avgTower'] = pd.DataFrame.from_dict({"Team Id": champs, "Average": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal['avgKills'].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['avgKills'] = pd.DataFrame.from_dict({"Team Id": champs, "Average": vals})
-
-    champs = []
-    vals = []
-    stds = []
-    for x,y in dictVal['avgDuration'].items():
-        champs.append(datetime.utcfromtimestamp(int(x/1000)).strftime('%Y-%m-%d'))
-        itsok = False
-        y = y or 0
-
-
-        if y < 5000:
-            itsok = True
-
-        y = y if itsok else y/1000
-        y = y/60
-        vals.append(y)
-        z = dictVal['avgDuration_std'][x]
-        z = z or 0
-        z = z if itsok else z/1000
-        z = z/60
-        stds.append(z)
-    pandasRes['avgDuration'] = pd.DataFrame.from_dict({"Date": champs, "Minutes": vals, "Std": stds})
-
-    champs = []
-    vals = []
-    for x,y in dictVal["total_gold"].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['total_gold'] = pd.DataFrame.from_dict({"Match Id": champs, "Total": vals})
-
-    champs = []
-    vals = []
-    for x,y in dictVal["total_exp"].items():
-        champs.append(x)
-        vals.append(y)
-    pandasRes['total_exp'] = pd.DataFrame.from_dict({"Match Id": champs, "Total": vals})
+    dictVal = backend.runQuery(queries,**queryArgs)
+    for name,(keyCol,valCol) in PANDAS_COLUMNS.items():
+        if name not in dictVal:
+            continue
+        if name.startswith("total_") and backend.totalsMode == "buckets":
+            keyCol,valCol = ("Match Id","Total")
+        pandasRes[name] = pd.DataFrame.from_dict({keyCol: list(dictVal[name].keys()), valCol: list(dictVal[name].values())})
+
+    if 'avgDuration' in dictVal:
+        champs = []
+        vals = []
+        stds = []
+        for x,y in dictVal['avgDuration'].items():
+            champs.append(datetime.utcfromtimestamp(int(x/1000)).strftime('%Y-%m-%d'))
+            itsok = False
+            y = y or 0
+
+
+            if y < 5000:
+                itsok = True
+
+            y = y if itsok else y/1000
+            y = y/60
+            vals.append(y)
+            z = dictVal['avgDuration_std'][x]
+            z = z or 0
+            z = z if itsok else z/1000
+            z = z/60
+            stds.append(z)
+        pandasRes['avgDuration'] = pd.DataFrame.from_dict({"Date": champs, "Minutes": vals, "Std": stds})
     return pandasRes
 
 
 
+#(metadata name, aggregation) of the dropdown options, all sent in a single msearch
+METADATA_AGGS = [
+    ("gamemodes", {"terms": {"field": "info.gameMode.keyword", "size": 10}}),
+    ("queues", {"terms": {"field": "info.queueId", "size": 10}}),
+    ("platforms", {"terms": {"field": "info.platformId.keyword", "size": 10}}),
+    ("teams", {"nested": {"path": "info.teams"}, "aggs": {"match_counts": {"terms": {"field": "info.teams.teamId", "size": 10}}}}),
+]
+
 def getMetadata(client):
     res = {}
-    gameModes_q = {
-        "aggs": {
-            "match_counts": {
-                "terms": {
-                    "field": "info.gameMode.keyword",
-                    "size": 10
-                }
-            }
-        }
-    }
+    body = []
+    for _,agg in METADATA_AGGS:
+        body += [{"index": "matches"}, {"size": 0, "aggs": {"match_counts": agg}}]
+    responses = client.msearch(body=body, filter_path=["responses.aggregations"])["responses"]
+    buckets = {name:response["aggregations"]["match_counts"] for (name,_),response in zip(METADATA_AGGS,responses)}
+
+    res["gamemodes"] = [x["key"].lower() for x in buckets["gamemodes"]["buckets"]]
+    res["queues"] = [x["key"] for x in buckets["queues"]["buckets"]]
+    res["platforms"] = [x["key"].lower() for x in buckets["platforms"]["buckets"]]
+    res["teams"] = [x["key"] for x in buckets["teams"]["match_counts"]["buckets"]]
+    return res
 
-    queues_q = {
-        "aggs": {
-            "match_counts": {
-                "terms": {
-                    "field": "info.queueId",
-                    "size": 10
-                }
-            }
-        }
-    }
 
-    platforms_q = {
-        "aggs": {
-            "match_counts": {
-                "terms": {
-                    "field": "info.platformId.keyword",
-                    "size": 10
-                }
-            }
-        }
-    }
-    teams_q = {
-        "aggs": {
-            "teams": {
-                "nested": {
-                    "path": "info.teams"
-                },
-                "aggs": {
-                    "match_counts":{
-                        "terms": {
-                            "field": "info.teams.teamId",
-                            "size": 10
-                        }
-                    }
-                }
-            }
-        }
-    }
-    response = client.search(index="matches", body=gameModes_q)
-    res["gamemodes"] = [x["key"].lower() for x in response["aggregations"]["match_counts"]["buckets"]]
+#the backends behind getPandas: runQuery(queries,**queryArgs) -> {query name: {key: value}} and getMetadata()
+class OpenSearchBackend(object):
+    totalsMode = TOTALS_MODE
 
-    response = client.search(index="matches", body=queues_q)
-    res["queues"] = [x["key"] for x in response["aggregations"]["match_counts"]["buckets"]]
+    def __init__(self, client):
+        self.client = client
 
-    response = client.search(index="matches", body=platforms_q)
-    res["platforms"] = [x["key"].lower() for x in response["aggregations"]["match_counts"]["buckets"]]
+    def runQuery(self, queries=None, **queryArgs):
+        return runQuery(self.client,queries,**queryArgs)
 
-    response = client.search(index="matches", body=teams_q)
-    res["teams"] = [x["key"] for x in response["aggregations"]["teams"]["match_counts"]["buckets"]]
-    return res
+    def getMetadata(self):
+        return getMetadata(self.client)
+
+
+def get_backend(name=DASH_BACKEND):
+    if name == "duckdb":
+        from DuckDBBackend import DuckDBBackend
+        return DuckDBBackend(ROLLUP_DIR,TOTAL_GOLD_INTERVAL,TOTAL_EXP_INTERVAL,None if COMPOSITE_QUERIES else 40)
+    return OpenSearchBackend(get_os_client(CLUSTER_URL,USNAME,PASSWD))
+
+
+def readMetadata(path):
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        return cached["metadata"], cached["time"]
+    except (OSError, ValueError, KeyError):
+        return None, 0
+
+def writeMetadata(path,metadata,updated):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+    with open(tmpPath, "w") as f:
+        json.dump({"time": updated, "metadata": metadata}, f)
+    os.replace(tmpPath, path)
+
+
+#metadata from the cache file (queried only when there is none yet), kept fresh by a daemon thread
+#that also picks up refreshes written by other worker processes
+class MetadataRefresher(object):
+    def __init__(self, backend, path=METADATA_CACHE_PATH, interval=METADATA_REFRESH):
+        self.backend = backend
+        self.path = path
+        self.interval = interval
+        self.metadata, self.updated = readMetadata(path)
+        if self.metadata is None:
+            self.refresh()
+
+    def refresh(self):
+        metadata = self.backend.getMetadata()
+        self.updated = time.time()
+        self.metadata = metadata
+        writeMetadata(self.path, metadata, self.updated)
+
+    def run(self):
+        while True:
+            time.sleep(max(self.updated + self.interval - time.time(), 1))
+            metadata, updated = readMetadata(self.path)
+            if updated + self.interval > time.time():
+                self.metadata, self.updated = metadata, updated
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                #retried in a minute
+                print(f"metadata refresh failed: {e}", file=sys.stderr)
+                self.updated = time.time() - self.interval + 60
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
 
 
 
@@ -463,25 +618,28 @@ def getMetadata(client):
 ##################################################################
 
 
+queryCache = QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_DIR)
 
-# Import packages
-from dash import Dash, html, dash_table, dcc, callback, Output, Input
-import pandas as pd
-import plotly.express as px
-import dash_mantine_components as dmc
-import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-
-client = get_os_client(CLUSTER_URL,USNAME,PASSWD)
+#the backend client, the metadata and the EDA images are created on first use,
+#importing the module (gunicorn workers, tests) doesn't touch the cluster or the disk
+lazyObjects = {}
+lazyLock = threading.RLock()
 
+def lazy(name,build):
+    with lazyLock:
+        if name not in lazyObjects:
+            lazyObjects[name] = build()
+        return lazyObjects[name]
 
-metaData = getMetadata(client)
+def getBackend():
+    return lazy("backend",get_backend)
 
-# Incorporate data
-df = getPandas(client)
+def getMetadataRefresher():
+    return lazy("metadata",lambda: MetadataRefresher(getBackend()).start())
 
 
-app = Dash(external_stylesheets=[dbc.themes.BOOTSTRAP],suppress_callback_exceptions=True)
+def cache_stats():
+    return queryCache.stats()
 
 # the style arguments for the sidebar. We use position:fixed and a fixed width
 SIDEBAR_STYLE = {
@@ -500,91 +658,92 @@ CONTENT_STYLE = {
     "margin-left": "20%",
 }
 
-sidebarMatchs = html.Div(
-    [
-        html.H2("Dashboard", className="display-4"),
-        html.P(
-            "Matches Analytics", className="lead"
-        ),
-        dbc.Nav(
-            [
-                html.Div(["Game Modes Selection",
-                    dcc.Dropdown([x for x in metaData["gamemodes"]],
-                        [],
-                        id="gamemodes-selector",
-                        multi=True,
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                html.Div(["Queues Selection",
-                    dcc.Dropdown([f"{x} - {[y for y in queueConstants if y['queueId'] == x][0]['description']}" for x in metaData["queues"]],
-                        [],
-                        id="queues-selector",
-                        multi=True,
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                
-                html.Div(["Platforms Selection",
-                    dcc.Dropdown([x for x in metaData["platforms"]],
-                        [],
-                        id="platforms-selector",
-                        multi=True,
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                html.Hr(),
-
-                html.Div(["Date Range",
-                    dcc.DatePickerRange(
-                        display_format='YYYY-MM-DD',
-                        clearable=True,
-                        id="dateRange-selector",
-                    )
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                html.Hr(),
-
-                html.Div(["Date Aggregations",
-                    dcc.Dropdown([{'label': html.Div(x, style={'font-size': 15, 'padding-left': 10}), 'value': y} for x,y in [("days","1d"),("weeks","1w"),("month", "1M"),("quarter","1q")]],
-                        id="date-aggs-selector",
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                
-
-                html.Div(["Teams Display",
-                    dcc.Checklist([{'label': html.Div(x, style={'font-size': 15, 'padding-left': 10}), 'value': x} for x in metaData["teams"]],
-                                  [],
-                                  id="teams-selector",
-                                  inline=True,
-                                  labelStyle = {'display': 'flex'}
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                html.Hr(),
-
-                html.Div(["Game State Display",
-                    dcc.Checklist([{'label': html.Div("Win", style={'font-size': 15, 'padding-left': 10}), 'value': "Win"},
-                                   {'label': html.Div("Loss", style={'font-size': 15, 'padding-left': 10}), 'value': "Loss"}],
-                                  [],
-                                  id="win-selector",
-                                  inline=True,
-                                  labelStyle = {'display': 'flex'}
-                    ),
-                ], style={"margin": "2%","margin-right": "3%"}),
-
-                html.Hr(),
-
-                html.Div(["Games Ammount (Histograms only)",
-                    dcc.Slider(5000, 30000, 5000 , value=15000, id='slider-game-amm')
-                ], style={"margin": "2%","margin-right": "3%"}),
-            ],
-            vertical=True,
-            pills=True,
-        ),
-    ],
-)
+def sidebarMatchs(metaData):
+    return html.Div(
+        [
+            html.H2("Dashboard", className="display-4"),
+            html.P(
+                "Matches Analytics", className="lead"
+            ),
+            dbc.Nav(
+                [
+                    html.Div(["Game Modes Selection",
+                        dcc.Dropdown([x for x in metaData["gamemodes"]],
+                            [],
+                            id="gamemodes-selector",
+                            multi=True,
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    html.Div(["Queues Selection",
+                        dcc.Dropdown([f"{x} - {[y for y in queueConstants if y['queueId'] == x][0]['description']}" for x in metaData["queues"]],
+                            [],
+                            id="queues-selector",
+                            multi=True,
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    
+                    html.Div(["Platforms Selection",
+                        dcc.Dropdown([x for x in metaData["platforms"]],
+                            [],
+                            id="platforms-selector",
+                            multi=True,
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    html.Hr(),
+
+                    html.Div(["Date Range",
+                        dcc.DatePickerRange(
+                            display_format='YYYY-MM-DD',
+                            clearable=True,
+                            id="dateRange-selector",
+                        )
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    html.Hr(),
+
+                    html.Div(["Date Aggregations",
+                        dcc.Dropdown([{'label': html.Div(x, style={'font-size': 15, 'padding-left': 10}), 'value': y} for x,y in [("days","1d"),("weeks","1w"),("month", "1M"),("quarter","1q")]],
+                            id="date-aggs-selector",
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    
+
+                    html.Div(["Teams Display",
+                        dcc.Checklist([{'label': html.Div(x, style={'font-size': 15, 'padding-left': 10}), 'value': x} for x in metaData["teams"]],
+                                      [],
+                                      id="teams-selector",
+                                      inline=True,
+                                      labelStyle = {'display': 'flex'}
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    html.Hr(),
+
+                    html.Div(["Game State Display",
+                        dcc.Checklist([{'label': html.Div("Win", style={'font-size': 15, 'padding-left': 10}), 'value': "Win"},
+                                       {'label': html.Div("Loss", style={'font-size': 15, 'padding-left': 10}), 'value': "Loss"}],
+                                      [],
+                                      id="win-selector",
+                                      inline=True,
+                                      labelStyle = {'display': 'flex'}
+                        ),
+                    ], style={"margin": "2%","margin-right": "3%"}),
+
+                    html.Hr(),
+
+                    html.Div(["Games Ammount (Histograms only)",
+                        dcc.Slider(5000, 30000, 5000 , value=15000, id='slider-game-amm')
+                    ], style={"margin": "2%","margin-right": "3%"}),
+                ],
+                vertical=True,
+                pills=True,
+            ),
+        ],
+    )
 
 contentMatchs = html.Div([
     dbc.Row([
@@ -640,19 +799,21 @@ contentMatchs = html.Div([
 ],id="page-content")
 
 
-corrEDA = html.Img(src=Image.open(os.path.join("imagesEDA","corrEDA.png")),style={"width":"80%",})
-pairsEDA = html.Img(src=Image.open(os.path.join("imagesEDA","pairsEDA.png")),style={"width":"80%"})
-plotsEDA = html.Img(src=Image.open(os.path.join("imagesEDA","plotsEDA.png")),style={"width":"80%"})
-tierEDA = html.Img(src=Image.open(os.path.join("imagesEDA","tierEDA.png")),style={"width":"80%"})
+def buildContentEDA():
+    from PIL import Image
+    corrEDA = html.Img(src=Image.open(os.path.join("imagesEDA","corrEDA.png")),style={"width":"80%",})
+    pairsEDA = html.Img(src=Image.open(os.path.join("imagesEDA","pairsEDA.png")),style={"width":"80%"})
+    plotsEDA = html.Img(src=Image.open(os.path.join("imagesEDA","plotsEDA.png")),style={"width":"80%"})
+    tierEDA = html.Img(src=Image.open(os.path.join("imagesEDA","tierEDA.png")),style={"width":"80%"})
 
-contentEDA = html.Div([corrEDA,
-    html.Hr(),
-    pairsEDA,
-    html.Hr(),
-    plotsEDA,
-    html.Hr(),
-    tierEDA,
-])
+    return html.Div([corrEDA,
+        html.Hr(),
+        pairsEDA,
+        html.Hr(),
+        plotsEDA,
+        html.Hr(),
+        tierEDA,
+    ])
 
 
 sidebarEDA = html.Div(
@@ -752,7 +913,7 @@ contentBenchmarks = html.Div([
 
  
 
-app.layout = html.Div([
+layout = html.Div([
     html.Div(id='sidebar-content',style=SIDEBAR_STYLE),
     html.Div([
         dcc.Tabs(id="tabs-example-graph", value='dash-tab', children=[
@@ -773,11 +934,11 @@ app.layout = html.Div([
         )
 def render_content(tab):
     if tab == 'eda-tab':
-        return (html.Div([contentEDA]),sidebarEDA)
+        return (html.Div([lazy("contentEDA",buildContentEDA)]),sidebarEDA)
     elif tab == 'bmk-tab':
         return (html.Div([contentBenchmarks]),sidebarBenchmark)
     else:
-        return (html.Div([contentMatchs]),sidebarMatchs)
+        return (html.Div([contentMatchs]),sidebarMatchs(getMetadataRefresher().metadata))
 
 
 
@@ -797,40 +958,63 @@ def render_content(tab):
     Input("models-selector","value"),
 )
 def update_model_bench(modNameInpt):
-    
-    platforms = ["cpu","local_cpu","gpu"]
-    metrics = ["precision","recall","f1-score"]
-    ranks = ["IRON","BRONZE","SILVER","GOLD","PLATINUM","DIAMOND","MASTER","GRANDMASTER","CHALLENGER"]
-    df = pd.DataFrame(columns=["model","platform","train_time","predict_time","accuracy"] + metrics)
-   
-    rankMetrics = pd.DataFrame(columns=["model","platform", "value", "metric","rank"])
+    rankMetrics, figures = lazy("bench",BenchCache).get()
+    return *figures,*rankFigures(rankMetrics,modNameInpt)
+
+
+BENCH_DIR = "JSONS"
+BENCH_PLATFORMS = ["cpu","local_cpu","gpu"]
+BENCH_METRICS = ["precision","recall","f1-score"]
+#ladder order, a tier missing from a result file (EMERALD in the older ones) is skipped for that file
+BENCH_RANKS = TIERS
+
+#(median, ci low, ci high) seconds of a results file, schema 1 files hold a single start/stop sample
+def benchTime(data,timeType):
+    if data.get("schema_version", 1) >= 2:
+        return data[timeType]["median"], data[timeType]["ci_low"], data[timeType]["ci_high"]
+    return data[timeType]["stop"] - data[timeType]["start"], np.nan, np.nan
+
+
+#one row per (model, platform) and one per (model, platform, rank, metric)
+def loadBenchTables(benchDir=BENCH_DIR):
+    benchRows = []
+    rankRows = []
     modNamesDict = {x:y for x,y in zip(modNames,modDisplay)}
     for modName in modNames:
-        for platform in platforms:
-            f = open(os.path.join("JSONS",f'{modName}_{platform}.json'))
-            data = json.load(f)
-            values = [modNamesDict[modName], platform, data["train_time"]["stop"] - data["train_time"]["start"], data["predict_time"]["stop"] - data["predict_time"]["start"], data["accuracy"]]
-            values += [data["metrics"]["weighted avg"][x] for x in metrics]
+        for platform in BENCH_PLATFORMS:
+            with open(os.path.join(benchDir,f'{modName}_{platform}.json')) as f:
+                data = json.load(f)
+            values = [modNamesDict[modName], platform, *benchTime(data,"train_time"), *benchTime(data,"predict_time"), data["accuracy"]]
+            values += [data["metrics"]["weighted avg"][x] for x in BENCH_METRICS]
             
-            for rank in ranks:
-                for x in metrics:
-                    rankVals = [modNamesDict[modName], platform, data["metrics"][rank][x], x, rank]
-                    rankMetrics.loc[len(rankMetrics.index)] = rankVals
+            for rank in [x for x in BENCH_RANKS if x in data["metrics"]]:
+                for x in BENCH_METRICS:
+                    rankRows.append([modNamesDict[modName], platform, data["metrics"][rank][x], x, rank])
             
-            df.loc[len(df.index)] = values
+            benchRows.append(values)
+
+    timeColumns = [x + y for x in ["train_time","predict_time"] for y in ["","_ci_low","_ci_high"]]
+    df = pd.DataFrame.from_records(benchRows, columns=["model","platform"] + timeColumns + ["accuracy"] + BENCH_METRICS)
+    for timeType in ["train_time","predict_time"]:
+        df[timeType + "_err_plus"] = df[timeType + "_ci_high"] - df[timeType]
+        df[timeType + "_err_minus"] = df[timeType] - df[timeType + "_ci_low"]
+    rankMetrics = pd.DataFrame.from_records(rankRows, columns=["model","platform", "value", "metric","rank"])
+    return df, rankMetrics
 
+
+#the time and metrics figures, the same for every model selection
+def benchFigures(df):
     df_no_SVM = df[df["model"] != "SVM"]
     df_only_SVM = df[df["model"] == "SVM"]
-    
-    figs = {}
+
     figTimes = {}
-    figs["times"] = figTimes
     for timeType in ["train_time","predict_time"]:
         figTimes[timeType] = []
         typeTimeVal = "Training" if timeType == "train_time" else "Predicting"
-        figTimes[timeType].append(px.histogram(df_no_SVM, x="model", y=timeType,
+        #one row per (model, platform), the error bars are the confidence interval of the median (schema 2 results)
+        figTimes[timeType].append(px.bar(df_no_SVM, x="model", y=timeType,
                      color='platform', barmode='group',
-                     histfunc='avg',
+                     error_y=timeType + "_err_plus", error_y_minus=timeType + "_err_minus",
                       labels={
                         timeType: f"{typeTimeVal} Time (seconds)",
                         "model": "Model",
@@ -838,19 +1022,18 @@ def update_model_bench(modNameInpt):
                         },
                      title=f"{typeTimeVal} Time Chart",
                      height=400).update_layout(yaxis_title=f"{typeTimeVal} Time (seconds)"))
-        figTimes[timeType].append(px.histogram(df_only_SVM, x="model", y=timeType,
+        figTimes[timeType].append(px.bar(df_only_SVM, x="model", y=timeType,
                      color='platform', barmode='group',
+                     error_y=timeType + "_err_plus", error_y_minus=timeType + "_err_minus",
                       labels={
                         timeType: f"{typeTimeVal} Time (seconds)",
                         "model": "Model",
                         "platform": "Platform"
                         },
-                     histfunc='avg',
                      title=f"{typeTimeVal} Time Chart for SVM",
                      height=400).update_layout(yaxis_title=f"{typeTimeVal} Time (seconds)"))
     figMetrics = []
-    figs["metrics"] = figMetrics
-    for metric in metrics + ["accuracy"]:
+    for metric in BENCH_METRICS + ["accuracy"]:
         figMetrics.append(px.histogram(df, x="model", y=metric,
                                 color='platform', barmode='group',
                                 histfunc='avg',
@@ -861,56 +1044,97 @@ def update_model_bench(modNameInpt):
                                 },
                                 title=f"{metric[0].upper()}{metric[1:]}",
                                 height=400).update_layout(yaxis_title="value"))
-    figRanks = {}
-    figs["ranks"] = figRanks
-    for modName in modNames:
-        figRanks[modName] = []
-        for platform in platforms:
-            df_aux = rankMetrics[rankMetrics["platform"] == platform]
-            df_val = df_aux[df_aux["model"] == modNamesDict[modName]]
-            figRanks[modName].append(px.histogram(df_val, x="metric", y="value",
-                                            color='rank', barmode='group',
-                                            histfunc='avg',
-                                            title=f"{modNamesDict[modName]} @ {platform}",
-                                            labels={
-                                                "metric": "Metric",
-                                                "value": "",
-                                                "rank": "Ranks"
-                                            },
-                                            height=400).update_layout(yaxis_title=""))
-
-    return *figTimes["train_time"],*figTimes["predict_time"],*figMetrics,*figRanks[modNameInpt]
-
-
-
+    return [*figTimes["train_time"],*figTimes["predict_time"],*figMetrics]
 
 
+#the per rank figures of one model, one per platform
+def rankFigures(rankMetrics,modName):
+    modNamesDict = {x:y for x,y in zip(modNames,modDisplay)}
+    df_model = rankMetrics[rankMetrics["model"] == modNamesDict[modName]]
+    figRanks = []
+    for platform in BENCH_PLATFORMS:
+        df_val = df_model[df_model["platform"] == platform]
+        figRanks.append(px.histogram(df_val, x="metric", y="value",
+                                        color='rank', barmode='group',
+                                        histfunc='avg',
+                                        category_orders={"rank": BENCH_RANKS},
+                                        title=f"{modNamesDict[modName]} @ {platform}",
+                                        labels={
+                                            "metric": "Metric",
+                                            "value": "",
+                                            "rank": "Ranks"
+                                        },
+                                        height=400).update_layout(yaxis_title=""))
+    return figRanks
+
+
+def benchSignature(benchDir=BENCH_DIR):
+    return tuple(sorted((x.name, x.stat().st_mtime_ns) for x in os.scandir(benchDir) if x.name.endswith(".json")))
+
+#benchmark tables and model independent figures, rebuilt when a json of benchDir is added or modified
+class BenchCache(object):
+    def __init__(self, benchDir=BENCH_DIR):
+        self.benchDir = benchDir
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        signature = benchSignature(self.benchDir)
+        with self.lock:
+            if signature != self.signature:
+                try:
+                    df, self.rankMetrics = loadBenchTables(self.benchDir)
+                except ValueError:
+                    #a results file still being written, the previous tables are kept until the next check
+                    if self.signature is None:
+                        raise
+                    return self.rankMetrics, self.figures
+                self.figures = benchFigures(df)
+                self.signature = signature
+            return self.rankMetrics, self.figures
+
+
+
+
+
+
+
+#charts queried and drawn together, every group has its own callback and query,
+#so the cheap panels don't wait on the heavy total_gold/total_exp buckets
+CHART_GROUPS = {
+    "champions": ["championFirstBlood","championPick"],
+    "duration": ["avgDuration"],
+    "wins": ["teamWins","teamFirstBlood"],
+    "objectives": ["avgBarons","avgDragon","avgTower","avgKills"],
+    "gold": ["total_gold"],
+    "exp": ["total_exp"],
+}
 
+#the runQuery arguments each group's queries read, its cache key is built from these only
+#(the date histogram interval doesn't invalidate the champions, wins or objectives)
+MATCH_FILTERS = ["gameMode","qType","dateRange","platformId"]
+GROUP_ARGS = {
+    "champions": MATCH_FILTERS + ["playerWinner","playerTeamId"],
+    "duration": MATCH_FILTERS + ["dateAggs"],
+    "wins": MATCH_FILTERS + ["teamWinner","teamId","playerWinner","playerTeamId"],
+    "objectives": MATCH_FILTERS + ["teamWinner","teamId"],
+    "gold": MATCH_FILTERS + ["teamId","playerWinner","qSize"],
+    "exp": MATCH_FILTERS + ["teamId","playerWinner","qSize"],
+}
 
-# Add controls to build the interaction
-@callback(
-    Output(component_id='graph-placeholder', component_property='figure'),
-    Output(component_id='graph-placeholderA', component_property='figure'),
-    Output(component_id='graph-placeholderB', component_property='figure'),
-    Output(component_id='graph-placeholderC', component_property='figure'),
-    Output(component_id='graph-placeholderD', component_property='figure'),
-    Output(component_id='graph-placeholderE', component_property='figure'),
-    Output(component_id='graph-placeholderF', component_property='figure'),
-    Output(component_id='graph-placeholderG', component_property='figure'),
-    Output(component_id='graph-placeholderH', component_property='figure'),
-    Output(component_id='graph-placeholderI', component_property='figure'),
-    Output(component_id='graph-placeholderJ', component_property='figure'),
+FILTER_INPUTS = [
     Input("gamemodes-selector","value"),
     Input("queues-selector","value"),
     Input("platforms-selector","value"),
     Input("teams-selector","value"),
     Input("win-selector","value"),
-    Input('slider-game-amm',"value"),
     Input("date-aggs-selector","value"),
     Input("dateRange-selector","start_date"),
     Input("dateRange-selector","end_date"),
-)
-def update_graph(gamemodes,queues,platforms,teams,win,gameAmm,dateAggs,*dateRange):
+]
+
+
+def filterArgs(gamemodes,queues,platforms,teams,win,dateAggs,*dateRange):
     gamemodes = gamemodes if len(gamemodes) > 0 else None
     queues = queues if len(queues) > 0 else None
     platforms = platforms if len(platforms) > 0 else None
@@ -932,21 +1156,33 @@ def update_graph(gamemodes,queues,platforms,teams,win,gameAmm,dateAggs,*dateRang
         timestampMin = time.mktime(datetime.strptime(dateRange[0],"%Y-%m-%d").timetuple())*1000
         timestampMax = time.mktime(datetime.strptime(dateRange[1],"%Y-%m-%d").timetuple())*1000
         dateRange = (timestampMin,timestampMax)
-    #print("bbbbbb",dateRange)
-    #print("gamemodes",gamemodes)        
-    #print("queues",queues)        
-    #print("platforms",platforms)        
-    #print("teams",teams)        
-    #print("win",win)        
-    #print("dateRange",dateRange)
-    #print("#####################################################################")
-
-    df = getPandas(client,teamWinner=win,teamId=teams,playerWinner=win,playerTeamId=teams,gameMode=gamemodes,qType=queues,dateRange=dateRange,platformId=platforms,qSize=gameAmm,dateAggs=dateAggs)
+
+    return dict(teamWinner=win,teamId=teams,playerWinner=win,playerTeamId=teams,gameMode=gamemodes,qType=queues,dateRange=dateRange,platformId=platforms,dateAggs=dateAggs)
+
+
+def groupPandas(group,queryArgs):
+    queryArgs = {x:queryArgs.get(x) for x in GROUP_ARGS[group]}
+    return queryCache.get_or_compute(normalize_key(backend=DASH_BACKEND,group=group,**queryArgs), lambda: getPandas(getBackend(),CHART_GROUPS[group],**queryArgs))
+
+
+@callback(
+    Output(component_id='graph-placeholder', component_property='figure'),
+    Output(component_id='graph-placeholderA', component_property='figure'),
+    *FILTER_INPUTS,
+)
+def update_champions(*filters):
+    df = groupPandas("champions",filterArgs(*filters))
     fig = px.histogram(df["championFirstBlood"], x=df["championFirstBlood"].columns[0], y = df["championFirstBlood"].columns[1],  title="championFirstBlood")
     figA = px.histogram(df["championPick"],x= df["championPick"].columns[0], y = df["championPick"].columns[1], title="championPick")
-    figB = px.pie(df["teamWins"], values= df["teamWins"].columns[1], names=df["teamWins"].columns[0], hole=.6, title="Wins")
-    figC = px.pie(df["teamFirstBlood"], values= df["teamFirstBlood"].columns[1], names=df["teamFirstBlood"].columns[0], hole=.6, title="First Blood")
-    figD = [px.pie(df[x], values= df[x].columns[1], names=df[x].columns[0], title="Average " + x[3:]) for x in ["avgBarons","avgDragon","avgTower","avgKills"]]
+    return fig,figA
+
+
+@callback(
+    Output(component_id='graph-placeholderB', component_property='figure'),
+    *FILTER_INPUTS,
+)
+def update_duration(*filters):
+    df = groupPandas("duration",filterArgs(*filters))
     figE = go.Figure([
             go.Scatter(
                 name='Average',
@@ -981,14 +1217,80 @@ def update_graph(gamemodes,queues,platforms,teams,win,gameAmm,dateAggs,*dateRang
         title='Average Match Duration',
         hovermode="x"
     )
+    return figE
 
-    figF = px.histogram(df["total_gold"], x=df["total_gold"].columns[1], title="Total Gold")
-    figG = px.histogram(df["total_exp"], x=df["total_exp"].columns[1],  title="Total Experience")
-    res = (fig,figA, figE, figF, figG, figB, figC, *figD)
-    return res
+
+@callback(
+    Output(component_id='graph-placeholderE', component_property='figure'),
+    Output(component_id='graph-placeholderF', component_property='figure'),
+    *FILTER_INPUTS,
+)
+def update_wins(*filters):
+    df = groupPandas("wins",filterArgs(*filters))
+    figB = px.pie(df["teamWins"], values= df["teamWins"].columns[1], names=df["teamWins"].columns[0], hole=.6, title="Wins")
+    figC = px.pie(df["teamFirstBlood"], values= df["teamFirstBlood"].columns[1], names=df["teamFirstBlood"].columns[0], hole=.6, title="First Blood")
+    return figB,figC
+
+
+@callback(
+    Output(component_id='graph-placeholderG', component_property='figure'),
+    Output(component_id='graph-placeholderH', component_property='figure'),
+    Output(component_id='graph-placeholderI', component_property='figure'),
+    Output(component_id='graph-placeholderJ', component_property='figure'),
+    *FILTER_INPUTS,
+)
+def update_objectives(*filters):
+    df = groupPandas("objectives",filterArgs(*filters))
+    figD = [px.pie(df[x], values= df[x].columns[1], names=df[x].columns[0], title="Average " + x[3:]) for x in ["avgBarons","avgDragon","avgTower","avgKills"]]
+    return tuple(figD)
+
+
+def totalsFigure(frame,title):
+    if "Match Id" in frame.columns:
+        return px.histogram(frame, x=frame.columns[1], title=title)
+    return px.bar(frame, x="Total", y="Matches", title=title)
+
+
+@callback(
+    Output(component_id='graph-placeholderC', component_property='figure'),
+    Input('slider-game-amm',"value"),
+    *FILTER_INPUTS,
+)
+def update_gold(gameAmm,*filters):
+    df = groupPandas("gold",filterArgs(*filters) | {"qSize":gameAmm})
+    figF = totalsFigure(df["total_gold"], "Total Gold")
+    return figF
+
+
+@callback(
+    Output(component_id='graph-placeholderD', component_property='figure'),
+    Input('slider-game-amm',"value"),
+    *FILTER_INPUTS,
+)
+def update_exp(gameAmm,*filters):
+    df = groupPandas("exp",filterArgs(*filters) | {"qSize":gameAmm})
+    figG = totalsFigure(df["total_exp"], "Total Experience")
+    return figG
+
+#prewarm loads the metadata and starts its refresher before the first request, a backend that can't be
+#reached yet leaves it to the first render of the matches tab
+def create_app(prewarm=True):
+    app = Dash(external_stylesheets=[dbc.themes.BOOTSTRAP],suppress_callback_exceptions=True)
+    app.layout = layout
+    app.server.add_url_rule("/cache-stats", "cache_stats", cache_stats)
+    if prewarm:
+        try:
+            getMetadataRefresher()
+        except Exception as e:
+            print(f"metadata not prewarmed: {e}", file=sys.stderr)
+    return app
+
+#WSGI entry point, e.g. gunicorn "DashBoard:create_server()"
+def create_server():
+    return create_app().server
 
 # Run the App
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    create_app().run(debug=True)
 
 
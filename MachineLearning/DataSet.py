@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+#Typed Parquet storage for aggPlayers, trainSplit and testSplit: float32 features and a categorical Tier.
+#CSV stays available as an export, and as a fallback when a dataset has no Parquet file yet.
+DATA_DIR = "csv"
+TIERS = ["IRON","BRONZE","SILVER","GOLD","PLATINUM","EMERALD","DIAMOND","MASTER","GRANDMASTER","CHALLENGER"]
+
+
+def dataset_path(name, dataDir=DATA_DIR, ext="parquet"):
+    return os.path.join(dataDir, f"{name}.{ext}")
+
+
+def typed_frame(df):
+    df = df.copy()
+    floats = df.select_dtypes("floating").columns
+    df[floats] = df[floats].astype(np.float32)
+    if "Tier" in df.columns:
+        #a tier outside TIERS would silently become NaN
+        unknown = set(df["Tier"].dropna().astype(str)) - set(TIERS)
+        if unknown:
+            raise ValueError(f"unknown tiers {sorted(unknown)}, add them to DataSet.TIERS")
+        df["Tier"] = pd.Categorical(df["Tier"], categories=TIERS)
+    return df
+
+
+def write_dataset(df, name, dataDir=DATA_DIR, exportCSV=False):
+    df = typed_frame(df)
+    df.to_parquet(dataset_path(name, dataDir))
+    if exportCSV:
+        df.to_csv(dataset_path(name, dataDir, "csv"))
+
+
+def read_dataset(name, dataDir=DATA_DIR, columns=None):
+    path = dataset_path(name, dataDir)
+    if os.path.exists(path):
+        return pd.read_parquet(path, columns=columns)
+
+    df = typed_frame(pd.read_csv(dataset_path(name, dataDir, "csv"), index_col=0))
+    return df if columns is None else df[columns]
+
+
+#converts an exported CSV chunk by chunk, one Parquet row group per chunk
+def csv_to_dataset(name, dataDir=DATA_DIR, chunkSize=100000):
+    writer = None
+    try:
+        for chunk in pd.read_csv(dataset_path(name, dataDir, "csv"), index_col=0, chunksize=chunkSize):
+            table = pa.Table.from_pandas(typed_frame(chunk), schema=writer.schema if writer else None, preserve_index=True)
+            if writer is None:
+                writer = pq.ParquetWriter(dataset_path(name, dataDir), table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+#DataFrame chunks of a dataset, one Parquet batch (or CSV chunk) at a time so it never has to fit in memory
+def iter_dataset(name, dataDir=DATA_DIR, chunkSize=100000):
+    path = dataset_path(name, dataDir)
+    if os.path.exists(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunkSize):
+            yield batch.to_pandas()
+        return
+
+    for chunk in pd.read_csv(dataset_path(name, dataDir, "csv"), index_col=0, chunksize=chunkSize):
+        yield typed_frame(chunk)
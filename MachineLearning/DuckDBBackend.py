@@ -0,0 +1,136 @@
+import os
+import glob
+import duckdb
+from MatchRollup import ROLLUP_DIR, TEAM_IDS
+
+#Dashboard backend answering the runQuery filters with SQL over the Parquet snapshot written by MatchRollup.py
+#(ROLLUP_TARGET = "parquet"), so the dashboard can be served without the cluster.
+#Results have the same {query name: {key: value}} layout as DashBoard.runQuery, totals come back as histogram bins.
+
+#calendar_interval of the date histogram -> date_trunc part
+DATE_PARTS = {"1d": "day", "1w": "week", "1M": "month", "1q": "quarter"}
+TEAM_OBJECTIVES = {"avgBarons": "baronKills", "avgKills": "championKills", "avgDragon": "dragonKills", "avgTower": "towerKills"}
+TOTALS = {"total_gold": ("gold", 2000), "total_exp": ("exp", 2500)}
+MATCH_COLUMNS = "matchId, gameCreation, gameDuration, gameMode, queueId, platformId"
+
+
+class DuckDBBackend(object):
+    totalsMode = "histogram"
+
+    #championLimit None returns every champion like the composite queries of the OpenSearch backend
+    #(COMPOSITE_QUERIES), 40 matches its terms aggregations
+    def __init__(self, rollupDir=ROLLUP_DIR, totalGoldInterval=TOTALS["total_gold"][1], totalExpInterval=TOTALS["total_exp"][1], championLimit=None):
+        self.intervals = {"total_gold": totalGoldInterval, "total_exp": totalExpInterval}
+        self.championLimit = championLimit
+        self.connection = duckdb.connect()
+        #part-*.parquet leaves out the "_" files of a refresh still being written, the glob is resolved on every query
+        matchesPath = os.path.join(rollupDir, "matches", "part-*.parquet")
+        participantsPath = os.path.join(rollupDir, "participants", "part-*.parquet")
+        for path in [matchesPath, participantsPath]:
+            if not glob.glob(path):
+                raise FileNotFoundError(f"no rollup parts in {os.path.dirname(path)}, run MatchRollup.py with ROLLUP_TARGET = \"parquet\" first")
+        self.connection.execute(f"CREATE VIEW matches AS SELECT * FROM read_parquet('{matchesPath}')")
+        self.connection.execute(f"CREATE VIEW participants AS SELECT * FROM read_parquet('{participantsPath}')")
+        #one row per (match, team), the flattened counterpart of info.teams
+        teams = [f"SELECT {MATCH_COLUMNS}, {teamId} AS teamId, win{teamId} AS win, " + ", ".join(f"{x}{teamId} AS {x}" for x in TEAM_OBJECTIVES.values()) + " FROM matches" for teamId in TEAM_IDS]
+        self.connection.execute("CREATE VIEW teams AS " + " UNION ALL ".join(teams))
+
+    #DuckDB connections are not thread safe, every query runs on its own cursor
+    def fetch(self, sql, params):
+        return self.connection.cursor().execute(sql, params).fetchall()
+
+    def match_filters(self, gameMode=None, qType=None, dateRange=None, platformId=None):
+        filters = ["TRUE"]
+        params = []
+        if gameMode is not None:
+            filters.append("list_contains(?, lower(gameMode))")
+            params.append([x.lower() for x in gameMode])
+        if qType is not None:
+            filters.append("list_contains(?, queueId)")
+            params.append([int(x) for x in qType])
+        if dateRange is not None:
+            filters.append("gameCreation BETWEEN ? AND ?")
+            params += [int(dateRange[0]), int(dateRange[1])]
+        if platformId is not None:
+            filters.append("list_contains(?, lower(platformId))")
+            params.append([x.lower() for x in platformId])
+        return filters, params
+
+    def sub_filters(self, matchFilters, win=None, teamId=None):
+        filters, params = matchFilters
+        filters = list(filters)
+        params = list(params)
+        if win is not None:
+            filters.append("win = ?")
+            params.append(win)
+        if teamId is not None:
+            filters.append("list_contains(?, teamId)")
+            params.append([int(x) for x in teamId])
+        return " AND ".join(filters), params
+
+    #size None counts every key
+    def counts(self, table, key, where, params, size, extra=None):
+        where = where if extra is None else f"{where} AND {extra}"
+        limit = "" if size is None else f" LIMIT {size}"
+        rows = self.fetch(f"SELECT {key}, count(*) AS c FROM {table} WHERE {where} GROUP BY {key} ORDER BY c DESC, {key}{limit}", params)
+        return dict(rows)
+
+    def totals(self, name, matchFilters, teamId=None, win=None):
+        field, _ = TOTALS[name]
+        interval = self.intervals[name]
+        filters, params = matchFilters
+        terms = []
+        totalParams = []
+        for team in teamId or TEAM_IDS:
+            if win is None:
+                terms.append(f"{field}{int(team)}")
+            else:
+                terms.append(f"CASE WHEN win{int(team)} = ? THEN {field}{int(team)} ELSE 0 END")
+                totalParams.append(win)
+        total = " + ".join(terms)
+        rows = self.fetch(f"SELECT floor(({total}) / {interval}) * {interval} AS bin, count(*) FROM matches WHERE {' AND '.join(filters)} GROUP BY bin ORDER BY bin", totalParams + params)
+        return {float(x): y for x,y in rows}
+
+    def runQuery(self, queries=None, teamWinner=None, teamId=None, playerWinner=None, playerTeamId=None, gameMode=None, qType=None, dateRange=None, platformId=None, qSize=10000, dateAggs=None):
+        wanted = lambda x: queries is None or x in queries
+        matchFilters = self.match_filters(gameMode, qType, dateRange, platformId)
+        playerWhere, playerParams = self.sub_filters(matchFilters, playerWinner, playerTeamId)
+        teamWhere, teamParams = self.sub_filters(matchFilters, teamWinner, teamId)
+
+        result = {}
+        if wanted("championFirstBlood"):
+            result["championFirstBlood"] = self.counts("participants", "championName", playerWhere, playerParams, self.championLimit, "firstBloodKill")
+        if wanted("championPick"):
+            result["championPick"] = self.counts("participants", "championName", playerWhere, playerParams, self.championLimit)
+        if wanted("teamFirstBlood"):
+            result["teamFirstBlood"] = self.counts("participants", "teamId", playerWhere, playerParams, 20, "firstBloodKill")
+        if wanted("teamWins"):
+            result["teamWins"] = self.counts("teams", "teamId", teamWhere, teamParams, 10, "win")
+
+        for name,field in TEAM_OBJECTIVES.items():
+            if wanted(name):
+                rows = self.fetch(f"SELECT teamId, avg({field}), stddev_pop({field}), count(*) AS c FROM teams WHERE {teamWhere} GROUP BY teamId ORDER BY c DESC, teamId LIMIT 10", teamParams)
+                result[name] = {x[0]: x[1] for x in rows}
+                result[name + "_std"] = {x[0]: x[2] for x in rows}
+
+        if wanted("avgDuration"):
+            part = DATE_PARTS[dateAggs or "1q"]
+            where = " AND ".join(matchFilters[0])
+            rows = self.fetch(f"SELECT epoch_ms(date_trunc('{part}', epoch_ms(gameCreation))) AS bucket, avg(gameDuration), stddev_pop(gameDuration) FROM matches WHERE {where} GROUP BY bucket ORDER BY bucket", matchFilters[1])
+            result["avgDuration"] = {x[0]: x[1] for x in rows}
+            result["avgDuration_std"] = {x[0]: x[2] for x in rows}
+
+        for name in TOTALS:
+            if wanted(name):
+                result[name] = self.totals(name, matchFilters, teamId, playerWinner)
+        return result
+
+    #terms aggregations skip documents without the field, the NULLs flatten_match writes for them are skipped too
+    def getMetadata(self):
+        top = lambda field, table: [x for x,_ in self.fetch(f"SELECT {field}, count(*) AS c FROM {table} WHERE {field} IS NOT NULL GROUP BY {field} ORDER BY c DESC LIMIT 10", [])]
+        res = {}
+        res["gamemodes"] = [x.lower() for x in top("gameMode", "matches")]
+        res["queues"] = top("queueId", "matches")
+        res["platforms"] = [x.lower() for x in top("platformId", "matches")]
+        res["teams"] = top("teamId", "teams")
+        return res
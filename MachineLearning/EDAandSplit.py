@@ -7,8 +7,9 @@ import seaborn as sb
 from opensearchpy import OpenSearch
 import warnings
 from sklearn.model_selection import train_test_split
+from DataSet import read_dataset, write_dataset
 
-df = pd.read_csv(os.path.join("csv","aggPlayers.csv"),index_col=0)
+df = read_dataset("aggPlayers")
 
 n_rows=10
 n_cols=4
@@ -17,6 +18,7 @@ df_numericals = df.drop(["Summoner Id","Tier","roleADC","roleSUP","roleJNG","rol
 
 
 PLOTS = False
+EXPORT_CSV = True
 
 if PLOTS:
     fig, axes = plt.subplots(nrows=n_rows, ncols=n_cols, figsize=(40,30),constrained_layout=True)
@@ -56,5 +58,5 @@ X_train["Tier"] = y_train
 X_test["Tier"] = y_test
 
 
-X_train.to_csv(os.path.join("csv","trainSplit.csv"))
-X_test.to_csv(os.path.join("csv","testSplit.csv"))
\ No newline at end of file
+write_dataset(X_train, "trainSplit", exportCSV=EXPORT_CSV)
+write_dataset(X_test, "testSplit", exportCSV=EXPORT_CSV)
\ No newline at end of file
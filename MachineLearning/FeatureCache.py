@@ -0,0 +1,78 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from DataSet import DATA_DIR, dataset_path, read_dataset
+
+#Scaled train/test matrices and encoded labels saved as .npy and opened memory-mapped,
+#so repeated benchmark runs and parallel workers share the same pages instead of redoing the preprocessing.
+#The cache folder is keyed by a hash of the split files and the scaler parameters.
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+ARRAYS = ["XTrain","XTest","yTrain","yTest","classes"]
+
+
+def source_path(name, dataDir):
+    path = dataset_path(name, dataDir)
+    return path if os.path.exists(path) else dataset_path(name, dataDir, "csv")
+
+
+def cache_key(paths, scalerParams):
+    digest = hashlib.sha256(json.dumps(scalerParams, sort_keys=True).encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def build_features(trainName, testName, dataDir, scalerParams, folder):
+    XTrain = read_dataset(trainName, dataDir)
+    XTest = read_dataset(testName, dataDir)
+
+    yTrain = XTrain.pop("Tier").astype(str)
+    yTest = XTest.pop("Tier").astype(str)
+
+    standard_scaler = StandardScaler(**scalerParams)
+    label_encoder = LabelEncoder()
+    label_encoder.fit(yTrain)
+
+    arrays = {
+        "XTrain": standard_scaler.fit_transform(XTrain),
+        "XTest": standard_scaler.transform(XTest),
+        "yTrain": label_encoder.transform(yTrain),
+        "yTest": label_encoder.transform(yTest),
+        "classes": label_encoder.classes_.astype(str),
+    }
+
+    #built aside and renamed, so concurrent workers never see a half written cache
+    tmpFolder = f"{folder}.tmp{os.getpid()}"
+    os.makedirs(tmpFolder, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(tmpFolder, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+    try:
+        os.rename(tmpFolder, folder)
+    except OSError:
+        shutil.rmtree(tmpFolder)
+
+
+#cache folder of the splits, built when missing. Hashing the split files is the costly part, processes that
+#open the same features many times take the folder once and then use open_features
+def features_folder(trainName="trainSplit", testName="testSplit", dataDir=DATA_DIR, scalerParams=None, cacheDir=CACHE_DIR):
+    scalerParams = scalerParams or {"with_mean": True, "with_std": True}
+    key = cache_key([source_path(trainName, dataDir), source_path(testName, dataDir)], scalerParams)
+    folder = os.path.join(cacheDir, key)
+
+    if not os.path.isdir(folder):
+        os.makedirs(cacheDir, exist_ok=True)
+        build_features(trainName, testName, dataDir, scalerParams, folder)
+    return folder
+
+
+def open_features(folder):
+    return tuple(np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r") for name in ARRAYS)
+
+
+def load_features(trainName="trainSplit", testName="testSplit", dataDir=DATA_DIR, scalerParams=None, cacheDir=CACHE_DIR):
+    return open_features(features_folder(trainName, testName, dataDir, scalerParams, cacheDir))
@@ -0,0 +1,163 @@
+import os
+import time
+import shutil
+import hashlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from threadpoolctl import threadpool_limits
+from sklearn.model_selection import StratifiedKFold, ParameterGrid
+from sklearn.metrics import accuracy_score,classification_report
+from FeatureCache import CACHE_DIR, features_folder, open_features
+from BenchmarkRunner import BENCH_DIR, SCHEMA_VERSION, SklearnBackend, summarize, write_result, benchmark_model, peak_rss_mb, reset_peak_rss, cpu_count
+
+#Successive halving over the parameters of the benchmark models: every candidate is cross validated on a small
+#number of training rows, the best 1/ETA go on to ETA times more rows, until one is left and refitted on the whole split.
+#The folds are cached as memory-mapped index arrays, the trials run in a process pool and each one is written
+#to SEARCH_DIR in the JSONS results layout.
+SEARCH_DIR = os.path.join(BENCH_DIR, "search")
+N_FOLDS = 3
+ETA = 3
+MIN_RESOURCE = 1000
+SCORE = "f1-score"
+WORKERS = os.cpu_count()
+
+SEARCH_SPACES = {
+    "XGBoost": {"max_depth": [4,6,8,10], "learning_rate": [0.1,0.3], "n_estimators": [100,200]},
+    "RandForest": {"max_depth": [None,10,20], "n_estimators": [100,300], "min_samples_leaf": [1,5]},
+    "KNN": {"n_neighbors": [5,15,31,63], "weights": ["uniform","distance"]},
+    #the unpenalized baseline against the l2 penalty at every C
+    "LR": [{"penalty": [None]}, {"penalty": ["l2"], "C": [0.01,0.1,1.0,10.0]}],
+    "SVM": {"C": [0.1,1.0,10.0], "gamma": ["scale",0.01,0.1]},
+}
+
+
+#the estimators of testeScikit.py with the searched parameters on top
+def model_factory(model, params, threads):
+    if model == "XGBoost":
+        from xgboost import XGBClassifier
+        return XGBClassifier(seed=42, n_jobs=threads, **params)
+    if model == "RandForest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(class_weight="balanced", n_jobs=threads or -1, random_state=42, **params)
+    if model == "KNN":
+        from sklearn.neighbors import KNeighborsClassifier
+        return KNeighborsClassifier(n_jobs=threads or -1, **params)
+    if model == "LR":
+        from sklearn.linear_model import LogisticRegression
+        #unpenalized like the benchmark LR unless the candidate sets a penalty
+        return LogisticRegression(class_weight="balanced", n_jobs=threads or -1, max_iter=1000, **({"penalty": None} | params))
+    if model == "SVM":
+        from sklearn.svm import SVC
+        return SVC(class_weight="balanced", random_state=42, **params)
+    raise ValueError(f"no search space for {model}")
+
+
+#stratified folds saved once per label vector, the train indices shuffled so any prefix is a random subsample
+def cached_folds(yTrain, nFolds=N_FOLDS, seed=42, cacheDir=CACHE_DIR):
+    digest = hashlib.sha256(np.ascontiguousarray(yTrain).tobytes())
+    digest.update(f"{nFolds}-{seed}".encode())
+    folder = os.path.join(cacheDir, "folds", digest.hexdigest()[:16])
+
+    if not os.path.isdir(folder):
+        tmpFolder = f"{folder}.tmp{os.getpid()}"
+        os.makedirs(tmpFolder, exist_ok=True)
+        rng = np.random.default_rng(seed)
+        splitter = StratifiedKFold(n_splits=nFolds, shuffle=True, random_state=seed)
+        for i,(train,val) in enumerate(splitter.split(np.zeros(len(yTrain)), yTrain)):
+            np.save(os.path.join(tmpFolder, f"train{i}.npy"), rng.permutation(train))
+            np.save(os.path.join(tmpFolder, f"val{i}.npy"), val)
+        try:
+            os.rename(tmpFolder, folder)
+        except OSError:
+            shutil.rmtree(tmpFolder)
+    return folder
+
+
+def load_folds(folder, nFolds=N_FOLDS):
+    return [(np.load(os.path.join(folder, f"train{i}.npy"), mmap_mode="r"), np.load(os.path.join(folder, f"val{i}.npy"), mmap_mode="r")) for i in range(nFolds)]
+
+
+#one candidate on the first `resource` shuffled training rows of every fold
+def run_trial(model, params, rung, trialId, resource, featuresFolder, foldsFolder, nFolds, threads, outDir):
+    XTrain, _, yTrain, _, classes = open_features(featuresFolder)
+    #the pool workers are reused, peak_rss_mb is the peak of this trial only
+    reset_peak_rss()
+    trainTimes = []
+    predictTimes = []
+    yTrue = []
+    yPred = []
+    with threadpool_limits(limits=threads):
+        for train,val in load_folds(foldsFolder, nFolds):
+            #sorted so the memory-mapped rows are read in order
+            rows = np.sort(train[:resource])
+            estimator = model_factory(model, params, threads)
+            start = time.perf_counter()
+            estimator.fit(XTrain[rows], yTrain[rows])
+            trained = time.perf_counter()
+            yPred.append(estimator.predict(XTrain[val]))
+            stop = time.perf_counter()
+            trainTimes.append(trained - start)
+            predictTimes.append(stop - trained)
+            yTrue.append(yTrain[val])
+
+    yTrue = np.concatenate(yTrue)
+    yPred = np.concatenate(yPred)
+    values = {
+        "schema_version": SCHEMA_VERSION,
+        "model": model,
+        "platform": "search",
+        "backend": "sklearn",
+        "trials": nFolds,
+        "warmup": 0,
+        "train_time": summarize(trainTimes),
+        "predict_time": summarize(predictTimes),
+        "peak_rss_mb": peak_rss_mb(),
+        "cpu_count": cpu_count(),
+        "threads": threads,
+        "params": params,
+        "rung": rung,
+        "resource": int(resource),
+        "metrics": classification_report(yTrue, yPred, output_dict=True,target_names=classes, labels=list(range(len(classes))), zero_division=0),
+        "accuracy": accuracy_score(yTrue, yPred),
+    }
+    write_result(values, os.path.join(outDir, f"{model}_rung{rung}_{trialId}.json"))
+    return values
+
+
+def halving_search(model, workers=WORKERS, nFolds=N_FOLDS, eta=ETA, minResource=MIN_RESOURCE, outDir=SEARCH_DIR):
+    os.makedirs(outDir, exist_ok=True)
+    featuresFolder = features_folder()
+    _, _, yTrain, _, _ = open_features(featuresFolder)
+    foldsFolder = cached_folds(yTrain, nFolds)
+    foldRows = min(len(x) for x,_ in load_folds(foldsFolder, nFolds))
+
+    candidates = list(ParameterGrid(SEARCH_SPACES[model]))
+    #rungs until a single candidate is left, the last one on (close to) every row of the folds
+    rungs = 0
+    while len(candidates) // eta ** rungs > 1:
+        rungs += 1
+    resource = max(foldRows // eta ** max(rungs - 1, 0), min(minResource, foldRows))
+    threads = max(cpu_count() // workers, 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rung in range(rungs):
+            resource = min(resource, foldRows)
+            futures = [executor.submit(run_trial, model, params, rung, i, resource, featuresFolder, foldsFolder, nFolds, threads, outDir) for i,params in enumerate(candidates)]
+            results = [x.result() for x in futures]
+            scores = [x["metrics"]["weighted avg"][SCORE] for x in results]
+            print(f"{model} rung {rung}: {len(candidates)} candidates on {resource} rows, best {SCORE} {max(scores):.4f}")
+
+            keep = max(len(candidates) // eta, 1)
+            candidates = [candidates[i] for i in np.argsort(scores)[::-1][:keep]]
+            resource *= eta
+
+    #the winner refitted on the whole train split and scored on the test split
+    best = candidates[0]
+    return benchmark_model(SklearnBackend(), model, lambda threads: model_factory(model, best, threads), open_features(featuresFolder), "best", outDir,
+                           trials=1, warmup=0, extra={"params": best})
+
+
+if __name__ == '__main__':
+    for model in ["XGBoost","RandForest","KNN","LR"]:
+        values = halving_search(model)
+        print(f"{model}: {values['params']}  test {SCORE} {values['metrics']['weighted avg'][SCORE]:.4f}")
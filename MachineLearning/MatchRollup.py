@@ -0,0 +1,219 @@
+import os
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+from opensearchpy import OpenSearch, helpers
+from dotenv import load_dotenv
+from tqdm import tqdm
+from DataSet import DATA_DIR
+
+#Flattened per-match and per-participant summaries of the matches index, so the dashboard can aggregate
+#plain fields instead of descending into the nested info.participants / info.teams documents.
+#The per-match summaries are kept in a side index (TOTALS_MODE = "rollup" of the dashboard), both of them in a
+#local Parquet store (the DuckDB backend), refreshed incrementally by info.gameCreation.
+
+load_dotenv()
+CLUSTER_URL = 'https://localhost:9200'
+USNAME = os.getenv('USERNM')
+PASSWD = os.getenv('PASSWORD')
+
+#"index" writes to the side indices, "parquet" to ROLLUP_DIR
+ROLLUP_TARGET = "index"
+ROLLUP_MATCHES_INDEX = "matches_rollup"
+ROLLUP_DIR = os.path.join(DATA_DIR, "rollup")
+PAGE_SIZE = 1000
+
+TEAM_IDS = [100,200]
+OBJECTIVES = ["champion","baron","dragon","tower","inhibitor","riftHerald"]
+PARTICIPANT_FIELDS = ["participantId","summonerId","teamId","win","championName","individualPosition","firstBloodKill","goldEarned","champExperience","kills","deaths","assists"]
+MATCH_SOURCE = ["info.gameCreation","info.gameDuration","info.gameMode","info.queueId","info.platformId","info.teams"] + [f"info.participants.{x}" for x in PARTICIPANT_FIELDS]
+
+NORMALIZED_KEYWORD = {"type": "keyword", "normalizer": "lowercase_normalizer"}
+INDEX_SETTINGS = {"analysis": {"normalizer": {"lowercase_normalizer": {"type": "custom", "filter": ["lowercase"]}}}}
+MATCH_KEYS = {
+    "matchId": {"type": "keyword"},
+    "gameCreation": {"type": "long"},
+    "gameDuration": {"type": "long"},
+    "gameMode": NORMALIZED_KEYWORD,
+    "queueId": {"type": "integer"},
+    "platformId": NORMALIZED_KEYWORD,
+}
+
+MATCH_SCHEMA = pa.schema(
+    [("matchId", pa.string()),("gameCreation", pa.int64()),("gameDuration", pa.int64()),("gameMode", pa.string()),("queueId", pa.int64()),
+     ("platformId", pa.string()),("totalGold", pa.int64()),("totalExp", pa.int64())] +
+    [x for teamId in TEAM_IDS for x in [(f"win{teamId}", pa.bool_()),(f"firstBlood{teamId}", pa.bool_()),(f"firstTower{teamId}", pa.bool_())] +
+        [(f"{objective}Kills{teamId}", pa.int64()) for objective in OBJECTIVES] + [(f"gold{teamId}", pa.int64()),(f"exp{teamId}", pa.int64())]]
+)
+PARTICIPANT_SCHEMA = pa.schema(
+    [("gameCreation", pa.int64()),("gameDuration", pa.int64()),("gameMode", pa.string()),("queueId", pa.int64()),("platformId", pa.string()),("matchId", pa.string()),
+     ("participantId", pa.int64()),("summonerId", pa.string()),("teamId", pa.int64()),("win", pa.bool_()),("championName", pa.string()),
+     ("individualPosition", pa.string()),("firstBloodKill", pa.bool_()),("goldEarned", pa.int64()),("champExperience", pa.int64()),
+     ("kills", pa.int64()),("deaths", pa.int64()),("assists", pa.int64())]
+)
+
+
+def get_os_client(cluster_url, username, password):
+    client = OpenSearch(
+        hosts=[cluster_url],
+        http_auth=(username, password),
+        verify_certs = False
+    )
+    return client
+
+
+def flatten_match(matchId, info):
+    match = {
+        "matchId": matchId,
+        "gameCreation": info.get("gameCreation"),
+        "gameDuration": info.get("gameDuration"),
+        "gameMode": info.get("gameMode"),
+        "queueId": info.get("queueId"),
+        "platformId": info.get("platformId"),
+        "totalGold": 0,
+        "totalExp": 0,
+    }
+
+    teams = {x.get("teamId"):x for x in info.get("teams", [])}
+    for teamId in TEAM_IDS:
+        team = teams.get(teamId, {})
+        objectives = team.get("objectives", {})
+        match[f"win{teamId}"] = bool(team.get("win", False))
+        match[f"firstBlood{teamId}"] = bool(objectives.get("champion", {}).get("first", False))
+        match[f"firstTower{teamId}"] = bool(objectives.get("tower", {}).get("first", False))
+        for objective in OBJECTIVES:
+            match[f"{objective}Kills{teamId}"] = objectives.get(objective, {}).get("kills", 0)
+        match[f"gold{teamId}"] = 0
+        match[f"exp{teamId}"] = 0
+
+    participants = []
+    for participant in info.get("participants", []):
+        row = {x:info.get(x) for x in MATCH_KEYS if x != "matchId"} | {"matchId": matchId}
+        row |= {x:participant.get(x) for x in PARTICIPANT_FIELDS}
+        participants.append(row)
+
+        gold = participant.get("goldEarned") or 0
+        exp = participant.get("champExperience") or 0
+        match["totalGold"] += gold
+        match["totalExp"] += exp
+        if participant.get("teamId") in TEAM_IDS:
+            match[f"gold{participant['teamId']}"] += gold
+            match[f"exp{participant['teamId']}"] += exp
+
+    return match, participants
+
+
+#pages of matches with gameCreation above the watermark (or from it, with inclusive), oldest first, read from a point in time
+def scan_matches(client, watermark, pageSize=PAGE_SIZE, keepAlive="5m", inclusive=False):
+    pitId = client.create_pit(index="matches", keep_alive=keepAlive)["pit_id"]
+    body = {
+        "size": pageSize,
+        "query": {"bool": {"filter": {"range": {"info.gameCreation": {"gte" if inclusive else "gt": watermark}}}}},
+        "_source": MATCH_SOURCE,
+        "pit": {"id": pitId, "keep_alive": keepAlive},
+        "sort": [{"info.gameCreation": "asc"}, {"_id": "asc"}],
+        "track_total_hits": False,
+    }
+    try:
+        while True:
+            hits = client.search(body=body, filter_path=["hits.hits._id","hits.hits._source","hits.hits.sort"]).get("hits", {}).get("hits", [])
+            if not hits:
+                break
+            yield hits
+            if len(hits) < pageSize:
+                break
+            body["search_after"] = hits[-1]["sort"]
+    finally:
+        client.delete_pit(body={"pit_id": [pitId]})
+
+
+#the per-match summaries only, no OpenSearch query reads per-participant rollup documents
+class IndexRollupTarget(object):
+    #the watermark is the latest match written, an interrupted run may have left other matches of the same
+    #gameCreation unwritten. They are scanned again, rewriting the same _id is harmless
+    inclusiveWatermark = True
+
+    def __init__(self, client, matchesIndex=ROLLUP_MATCHES_INDEX):
+        self.client = client
+        self.matchesIndex = matchesIndex
+        if not client.indices.exists(index=matchesIndex):
+            client.indices.create(index=matchesIndex, body={"settings": INDEX_SETTINGS, "mappings": {"properties": MATCH_KEYS}})
+
+    def watermark(self):
+        response = self.client.search(index=self.matchesIndex, body={"size": 0, "aggs": {"latest": {"max": {"field": "gameCreation"}}}})
+        return int(response["aggregations"]["latest"]["value"] or 0)
+
+    def write(self, matches, participants):
+        helpers.bulk(self.client, [{"_index": self.matchesIndex, "_id": x["matchId"], "_source": x} for x in matches])
+
+    def close(self, watermark):
+        self.client.indices.refresh(index=self.matchesIndex)
+
+
+#one Parquet part per run in ROLLUP_DIR/matches and ROLLUP_DIR/participants, the watermark in a json file
+class ParquetRollupTarget(object):
+    #the watermark is only saved with a complete part, and the parts would get duplicated rows
+    inclusiveWatermark = False
+
+    def __init__(self, rollupDir=ROLLUP_DIR):
+        self.rollupDir = rollupDir
+        self.writers = {}
+        self.paths = {}
+        self.watermarkPath = os.path.join(rollupDir, "watermark.json")
+        for name in ["matches","participants"]:
+            os.makedirs(os.path.join(rollupDir, name), exist_ok=True)
+
+    def watermark(self):
+        if not os.path.exists(self.watermarkPath):
+            return 0
+        with open(self.watermarkPath) as f:
+            return json.load(f)["gameCreation"]
+
+    def tmp_path(self, name):
+        return os.path.join(self.rollupDir, name, "_" + os.path.basename(self.paths[name]))
+
+    def write_table(self, name, rows, schema):
+        if not rows:
+            return
+        if name not in self.writers:
+            #written under a "_" name (skipped by Parquet dataset readers) and renamed when the run completes
+            self.paths[name] = os.path.join(self.rollupDir, name, f"part-{self.watermark()}.parquet")
+            self.writers[name] = pq.ParquetWriter(self.tmp_path(name), schema)
+        self.writers[name].write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    def write(self, matches, participants):
+        self.write_table("matches", matches, MATCH_SCHEMA)
+        self.write_table("participants", participants, PARTICIPANT_SCHEMA)
+
+    def close(self, watermark):
+        for name,writer in self.writers.items():
+            writer.close()
+            os.replace(self.tmp_path(name), self.paths[name])
+        with open(self.watermarkPath + ".tmp", "w") as f:
+            json.dump({"gameCreation": watermark}, f)
+        os.replace(self.watermarkPath + ".tmp", self.watermarkPath)
+
+
+def refresh_rollup(client, target, pageSize=PAGE_SIZE):
+    watermark = target.watermark()
+    latest = watermark
+    matchCount = 0
+    for hits in tqdm(scan_matches(client, watermark, pageSize, inclusive=target.inclusiveWatermark)):
+        matches = []
+        participants = []
+        for hit in hits:
+            match, matchParticipants = flatten_match(hit["_id"], hit["_source"].get("info", {}))
+            matches.append(match)
+            participants += matchParticipants
+            latest = max(latest, match["gameCreation"] or 0)
+        target.write(matches, participants)
+        matchCount += len(matches)
+    target.close(latest)
+    return matchCount, latest
+
+
+if __name__ == '__main__':
+    client = get_os_client(CLUSTER_URL,USNAME,PASSWD)
+    target = IndexRollupTarget(client) if ROLLUP_TARGET == "index" else ParquetRollupTarget()
+    matchCount, latest = refresh_rollup(client, target)
+    print(f"{matchCount} matches rolled up, watermark {latest}")
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import joblib
+import numpy as np
+import sklearn
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from DataSet import DATA_DIR, read_dataset
+from HalvingSearch import SEARCH_DIR, model_factory
+
+#A trained tier classifier saved with everything the prediction service needs: the fitted scaler, the label
+#classes and the feature columns in training order (the aggPlayers columns of DataFramePlayers.py without
+#"Summoner Id" and "Tier"). The model parameters are the HalvingSearch winner when there is one.
+ARTIFACT_DIR = "models"
+MODEL = "XGBoost"
+
+
+def artifact_path(model=MODEL, artifactDir=ARTIFACT_DIR):
+    return os.path.join(artifactDir, f"{model}.joblib")
+
+
+def best_params(model, searchDir=SEARCH_DIR):
+    try:
+        with open(os.path.join(searchDir, f"{model}_best.json")) as f:
+            return json.load(f)["params"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def train_artifact(model=MODEL, trainName="trainSplit", dataDir=DATA_DIR, artifactDir=ARTIFACT_DIR, params=None):
+    XTrain = read_dataset(trainName, dataDir)
+    yTrain = XTrain.pop("Tier").astype(str)
+    params = best_params(model) if params is None else params
+
+    scaler = StandardScaler()
+    label_encoder = LabelEncoder()
+    estimator = model_factory(model, params, None)
+    start = time.perf_counter()
+    estimator.fit(scaler.fit_transform(XTrain.to_numpy()), label_encoder.fit_transform(yTrain))
+    trainTime = time.perf_counter() - start
+
+    artifact = {
+        "model": model,
+        "params": params,
+        "estimator": estimator,
+        "scaler": scaler,
+        "classes": label_encoder.classes_.astype(str),
+        "columns": list(XTrain.columns),
+        "train_rows": len(XTrain.index),
+        "train_time": trainTime,
+        "sklearn_version": sklearn.__version__,
+    }
+    os.makedirs(artifactDir, exist_ok=True)
+    path = artifact_path(model, artifactDir)
+    joblib.dump(artifact, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def load_artifact(path=artifact_path()):
+    return joblib.load(path)
+
+
+#feature rows (dicts keyed by column or arrays in column order) to tier names
+class TierPredictor(object):
+    def __init__(self, artifact, onnxModel=None):
+        self.estimator = artifact["estimator"]
+        self.scaler = artifact["scaler"]
+        self.classes = artifact["classes"]
+        self.columns = artifact["columns"]
+        #batches are small and predicted one at a time, a thread pool per call costs more than it saves. The
+        #sklearn estimators read n_jobs at predict time, a fitted XGBoost booster keeps its own nthread
+        if hasattr(self.estimator, "get_booster"):
+            self.estimator.get_booster().set_param({"nthread": 1})
+        elif hasattr(self.estimator, "n_jobs"):
+            self.estimator.n_jobs = 1
+        #the OnnxExport compiled ensemble (OnnxExport.artifact_onnx), much cheaper per call on the small batches of the service
+        if onnxModel is not None:
+            self.estimator = onnxModel
+
+    def matrix(self, rows):
+        return np.array([[row[x] for x in self.columns] if isinstance(row, dict) else row for row in rows], dtype=np.float64)
+
+    def predict(self, X):
+        return self.classes[self.estimator.predict(self.scaler.transform(X))]
+
+
+if __name__ == '__main__':
+    print(train_artifact())
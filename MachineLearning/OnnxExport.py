@@ -0,0 +1,82 @@
+import os
+import hashlib
+import numpy as np
+
+#Tree ensembles (RandomForest, XGBoost) compiled to ONNX and predicted with ONNX Runtime, without the per call
+#Python/sklearn overhead that dominates small batches. Both paths take the scaled feature matrix and return the
+#encoded labels, like estimator.predict.
+
+
+def export_onnx(estimator, nFeatures, path, metadata=None):
+    if type(estimator).__name__ == "XGBClassifier":
+        from onnxmltools import convert_xgboost
+        from onnxmltools.convert.common.data_types import FloatTensorType
+        onnxModel = convert_xgboost(estimator, initial_types=[("input", FloatTensorType([None, nFeatures]))])
+    else:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        initialTypes = [("input", FloatTensorType([None, nFeatures]))]
+        #plain label/probability tensors instead of a list of dicts per row
+        onnxModel = convert_sklearn(estimator, initial_types=initialTypes, options={id(estimator): {"zipmap": False}})
+
+    for key,value in (metadata or {}).items():
+        entry = onnxModel.metadata_props.add()
+        entry.key, entry.value = key, str(value)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(onnxModel.SerializeToString())
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+class OnnxPredictor(object):
+    def __init__(self, path, threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if threads is not None:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.inputName = self.session.get_inputs()[0].name
+        self.labelName = self.session.get_outputs()[0].name
+        self.metadata = self.session.get_modelmeta().custom_metadata_map
+
+    def predict(self, X):
+        return self.session.run([self.labelName], {self.inputName: np.asarray(X, dtype=np.float32)})[0]
+
+
+def artifact_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def onnx_path(path):
+    return os.path.splitext(path)[0] + ".onnx"
+
+
+#models/<model>.onnx next to the ModelArtifact joblib file, tagged with the digest of that file
+def export_artifact(path=None):
+    from ModelArtifact import artifact_path, load_artifact
+    path = artifact_path() if path is None else path
+    artifact = load_artifact(path)
+    return export_onnx(artifact["estimator"], len(artifact["columns"]), onnx_path(path), {"artifact_sha256": artifact_digest(path)})
+
+
+#OnnxPredictor of the export of the artifact at path, None when there is none or it was exported from an
+#earlier artifact
+def artifact_onnx(path, threads=None):
+    onnxFile = onnx_path(path)
+    if not os.path.exists(onnxFile):
+        return None
+    onnxModel = OnnxPredictor(onnxFile, threads)
+    if onnxModel.metadata.get("artifact_sha256") != artifact_digest(path):
+        print(f"{onnxFile} was not exported from {path}, ignored (run OnnxExport.py again)")
+        return None
+    return onnxModel
+
+
+if __name__ == '__main__':
+    print(export_artifact())
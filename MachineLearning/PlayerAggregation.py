@@ -0,0 +1,289 @@
+import os
+import pandas as pd
+
+#(column name, info.participants field) pairs, in the aggPlayers.csv column order
+AVG_FIELDS = [
+    #KDA
+    ("killsAvg","kills"),("deathsAvg","deaths"),("assistsAvg","assists"),
+
+    #ChampionStats
+    ("champExperienceAvg","champExperience"),("damageSelfMitigatedAvg","damageSelfMitigated"),("goldEarnedAvg","goldEarned"),
+    ("totalDamageDealtAvg","totalDamageDealt"),("totalDamageDealtToChampionsAvg","totalDamageDealtToChampions"),
+    ("totalDamageShieldedOnTeammatesAvg","totalDamageShieldedOnTeammates"),("totalDamageTakenAvg","totalDamageTaken"),("totalHealAvg","totalHeal"),
+    ("totalMinionsKilledAvg","totalMinionsKilled"),("totalTimeSpentDeadAvg","totalTimeSpentDead"),("totalUnitsHealedAvg","totalUnitsHealed"),
+    ("visionScoreAvg","visionScore"),
+
+    #Objectives
+    ("baronKillsAvg","baronKills"),("dragonKillsAvg","dragonKills"),("damageDealtToObjectivesAvg","damageDealtToObjectives"),
+    ("damageDealtToBuildingsAvg","damageDealtToBuildings"),("nexusKillsAvg","nexusKills"),("nexusTakedownsAvg","nexusTakedowns"),
+    ("inhibitorKillsAvg","inhibitorKills"),("inhibitorTakedownsAvg","inhibitorTakedowns"),("killingSpreesAvg","killingSprees"),
+    ("largestKillingSpreeAvg","largestKillingSpree"),("totalAllyJungleMinionsKilledAvg","totalAllyJungleMinionsKilled"),
+    ("totalEnemyJungleMinionsKilledAvg","totalEnemyJungleMinionsKilled"),
+
+    #Metagame
+    ("timePlayingAvg","timePlayed"),("baitPingsAvg","baitPings"),("enemyMissingPingsAvg","enemyMissingPings"),("basicPingsAvg","basicPings"),
+]
+
+BOOL_FIELDS = [
+    ("firstBloodAvg","firstBloodKill"),("firstBloodAssistAvg","firstBloodAssist"),("firstTowerAssistAvg","firstTowerAssist"),
+    ("firstTowerKillAvg","firstTowerKill"),("earlySurrendersAvg","gameEndedInEarlySurrender"),("surrendersAvg","gameEndedInSurrender"),
+]
+
+ROLES = [("roleSUP","UTILITY"),("roleADC","BOTTOM"),("roleMID","MIDDLE"),("roleTOP","TOP"),("roleJNG","JUNGLE")]
+
+COLUMNS = ["Summoner Id", "Tier", "WinRate","TotalGames"] + [x for x,_ in AVG_FIELDS] + [x for x,_ in BOOL_FIELDS] + [x for x,_ in ROLES]
+
+RANKED_SOLO_QUEUE = 420
+
+
+#metric "stats" keeps the sum and count of every averaged field, so results can be merged later
+def player_aggs(metric="avg"):
+    aggs = {}
+    for name,field in AVG_FIELDS:
+        aggs[name] = {metric:{"field":f"info.participants.{field}"}}
+    for name,field in BOOL_FIELDS:
+        aggs[name] = {"terms":{"field":f"info.participants.{field}"}}
+    aggs["roleCounts"] = {"terms":{"field":"info.participants.individualPosition.keyword"}}
+    return aggs
+
+
+def player_base_values(summonerID, tier, wins, loss, totalGamesNormalizer):
+    return [summonerID, tier, wins/(wins+loss),(wins+loss)/totalGamesNormalizer]
+
+
+def parse_player_aggs(playerRes, totalMatchesAux):
+    totalMatches = totalMatchesAux if totalMatchesAux > 0 else 1
+    values = []
+
+    for avgKey,_ in AVG_FIELDS:
+        value = playerRes[avgKey]["value"]
+        value = value if value is not None and value != "None" else 0
+        values.append(value)
+
+    for boolKey,_ in BOOL_FIELDS:
+        value = [x["doc_count"] for x in playerRes[boolKey]["buckets"] if x["key"] == 1]
+        value = value[0] if len(value) else 0
+        values.append(value / totalMatches)
+
+    roleCounts = {x["key"]:x["doc_count"] for x in playerRes["roleCounts"]["buckets"]}
+    for _,role in ROLES:
+        values.append(roleCounts.get(role,0) / totalMatches)
+
+    return values
+
+
+def agg_player_performance_query(client, summonerID, tier, wins, loss, totalGamesNormalizer):
+    query = {
+        "query":{
+            "bool":{
+                "must":[
+                    {"match": { "info.queueId": RANKED_SOLO_QUEUE}},
+                    {
+                        "nested":{
+                          "path": "info.participants",
+                            "query": {
+                                "bool": {
+                                  "must": [
+                                    {"match": { "info.participants.summonerId": summonerID}},
+                                  ]
+                                }
+                            },
+                        },
+                    }
+                ]
+            }
+        },
+        "aggs":{
+            "players": {
+                "nested": {
+                    "path": "info.participants"
+                },
+                "aggs":{
+                    "single_player": {
+                       "filter": {
+                            "term":{
+                                "info.participants.summonerId.keyword": summonerID
+                            }
+                        },
+                        "aggs": player_aggs()
+                    },
+                }
+            },
+            "Ranked Count":{
+                "terms":{
+                    "field":"info.gameMode.keyword",
+                    "size":20
+                }
+            },
+        }
+    }
+
+    response = client.search(index="matches", body=query)
+
+    totalMatchesAux = sum([x["doc_count"] for x in response["aggregations"]["Ranked Count"]["buckets"]])
+
+    values = player_base_values(summonerID, tier, wins, loss, totalGamesNormalizer)
+    values.extend(parse_player_aggs(response["aggregations"]["players"]["single_player"], totalMatchesAux))
+
+    return totalMatchesAux,values
+
+
+#one request for a whole block of summoners: a terms bucket per summoner under the nested players agg,
+#the bucket doc_count is the number of ranked matches of that summoner (one participant per match)
+def players_block_query(summonerIDs, gameCreation=None, metric="avg"):
+    dateQuery = {"match_all":{}}
+    if gameCreation is not None:
+        dateQuery = {"range": {"info.gameCreation": {"gt": gameCreation[0],"lte": gameCreation[1]}}}
+
+    return {
+        "size": 0,
+        "query":{
+            "bool":{
+                "must":[
+                    {"match": { "info.queueId": RANKED_SOLO_QUEUE}},
+                    dateQuery,
+                    {
+                        "nested":{
+                            "path": "info.participants",
+                            "query": {
+                                "terms": {"info.participants.summonerId.keyword": summonerIDs}
+                            },
+                        },
+                    }
+                ]
+            }
+        },
+        "aggs":{
+            "players": {
+                "nested": {
+                    "path": "info.participants"
+                },
+                "aggs":{
+                    "by_player": {
+                        "terms":{
+                            "field": "info.participants.summonerId.keyword",
+                            "include": summonerIDs,
+                            "size": len(summonerIDs)
+                        },
+                        "aggs": player_aggs(metric)
+                    },
+                }
+            },
+        }
+    }
+
+
+def parse_players_block(response, block, totalGamesNormalizer):
+    buckets = {x["key"]:x for x in response["aggregations"]["players"]["by_player"]["buckets"]}
+
+    results = []
+    for summonerID, tier, wins, loss in zip(block["Summoner Id"], block["Tier"], block["Wins"], block["Loss"]):
+        playerRes = buckets.get(summonerID)
+        totalMatchesAux = playerRes["doc_count"] if playerRes is not None else 0
+
+        values = player_base_values(summonerID, tier, wins, loss, totalGamesNormalizer)
+        if playerRes is not None:
+            values.extend(parse_player_aggs(playerRes, totalMatchesAux))
+        results.append((totalMatchesAux,values))
+    return results
+
+
+#block is a slice of the ranks DataFrame, results keep the block order
+def agg_players_block_query(client, block, totalGamesNormalizer):
+    query = players_block_query(list(block["Summoner Id"]))
+    response = client.search(index="matches", body=query)
+    return parse_players_block(response, block, totalGamesNormalizer)
+
+
+#Incremental refresh: per summoner running sums and counts, and the gameCreation up to which matches were folded in.
+#Only matches newer than that watermark are aggregated and added to the stored accumulators.
+ACC_COLUMNS = ["matches"] + [f"{x}Sum" for x,_ in AVG_FIELDS] + [f"{x}Count" for x,_ in AVG_FIELDS] + [f"{x}Hits" for x,_ in BOOL_FIELDS] + [f"{x}Count" for x,_ in ROLES]
+STATE_COLUMNS = ["lastGameCreation"] + ACC_COLUMNS
+
+
+def latest_game_creation(client):
+    query = {
+        "size": 0,
+        "query": {"match": { "info.queueId": RANKED_SOLO_QUEUE}},
+        "aggs": {"latest": {"max": {"field": "info.gameCreation"}}}
+    }
+    response = client.search(index="matches", body=query)
+    return int(response["aggregations"]["latest"]["value"] or 0)
+
+
+def parse_player_accumulators(playerRes):
+    values = [playerRes["doc_count"]]
+    values += [playerRes[x]["sum"] or 0 for x,_ in AVG_FIELDS]
+    values += [playerRes[x]["count"] for x,_ in AVG_FIELDS]
+
+    for boolKey,_ in BOOL_FIELDS:
+        value = [x["doc_count"] for x in playerRes[boolKey]["buckets"] if x["key"] == 1]
+        values.append(value[0] if len(value) else 0)
+
+    roleCounts = {x["key"]:x["doc_count"] for x in playerRes["roleCounts"]["buckets"]}
+    values += [roleCounts.get(role,0) for _,role in ROLES]
+    return values
+
+
+#matches of the block in (watermark, cutoff], summoners without new matches get zero accumulators
+def agg_players_delta_query(client, summonerIDs, watermark, cutoff):
+    query = players_block_query(summonerIDs, (watermark, cutoff), "stats")
+    response = client.search(index="matches", body=query)
+    buckets = {x["key"]:x for x in response["aggregations"]["players"]["by_player"]["buckets"]}
+
+    zeros = [0] * len(ACC_COLUMNS)
+    rows = [parse_player_accumulators(buckets[x]) if x in buckets else zeros for x in summonerIDs]
+    return pd.DataFrame.from_records(rows, columns=ACC_COLUMNS, index=pd.Index(summonerIDs, name="Summoner Id"))
+
+
+def load_state(statePath):
+    if not os.path.exists(statePath):
+        return pd.DataFrame(columns=STATE_COLUMNS, index=pd.Index([], name="Summoner Id"), dtype="float64")
+    return pd.read_csv(statePath, index_col="Summoner Id")
+
+
+def save_state(state, statePath):
+    state.to_csv(statePath + ".tmp")
+    os.replace(statePath + ".tmp", statePath)
+
+
+#(summonerIDs, watermark) blocks for the summoners that can have matches newer than their watermark,
+#summoners sharing a watermark go in the same block so a single range filter serves the whole block
+def delta_blocks(state, summonerIDs, cutoff, blockSize):
+    watermarks = state["lastGameCreation"].reindex(pd.Index(summonerIDs).unique()).fillna(-1)
+    watermarks = watermarks[watermarks < cutoff].sort_values(kind="stable")
+
+    blocks = []
+    for watermark,group in watermarks.groupby(watermarks, sort=True):
+        ids = list(group.index)
+        blocks += [(ids[start:start + blockSize], int(watermark)) for start in range(0, len(ids), blockSize)]
+    return blocks
+
+
+def merge_state(state, delta, cutoff):
+    merged = state[ACC_COLUMNS].add(delta, fill_value=0)
+    merged.insert(0, "lastGameCreation", state["lastGameCreation"].reindex(merged.index))
+    merged.loc[delta.index, "lastGameCreation"] = cutoff
+    return merged
+
+
+#aggPlayers rows (COLUMNS order) for the ranked summoners that have matches, in ranks order
+def rows_from_state(state, ranks, totalGamesNormalizer):
+    df = ranks[["Summoner Id","Tier","Wins","Loss"]].join(state, on="Summoner Id", how="inner")
+    df = df[df["matches"] > 0]
+    totalMatches = df["matches"]
+
+    res = pd.DataFrame({
+        "Summoner Id": df["Summoner Id"],
+        "Tier": df["Tier"],
+        "WinRate": df["Wins"] / (df["Wins"] + df["Loss"]),
+        "TotalGames": (df["Wins"] + df["Loss"]) / totalGamesNormalizer,
+    })
+    for name,_ in AVG_FIELDS:
+        count = df[f"{name}Count"]
+        res[name] = (df[f"{name}Sum"] / count.where(count > 0)).fillna(0)
+    for name,_ in BOOL_FIELDS:
+        res[name] = df[f"{name}Hits"] / totalMatches
+    for name,_ in ROLES:
+        res[name] = df[f"{name}Count"] / totalMatches
+    return res[COLUMNS].reset_index(drop=True)
@@ -0,0 +1,108 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future, TimeoutError
+from flask import Flask, request, jsonify
+from ModelArtifact import TierPredictor, artifact_path, load_artifact
+
+#HTTP tier prediction from a summoner's aggregated features, POST /predict with {"features": {column: value}}
+#or {"instances": [...]} (dicts or lists in the artifact column order). Concurrent requests are grouped by a
+#MicroBatcher: one scaler transform + predict call per batch of up to MAX_BATCH rows, waiting at most MAX_WAIT seconds.
+MAX_BATCH = 64
+MAX_WAIT = 0.002
+#seconds a request waits for its batch before giving up
+RESULT_TIMEOUT = 10
+PORT = int(os.getenv('PREDICT_PORT', 8051))
+#predict with the ONNX Runtime export next to the artifact (OnnxExport.export_artifact) when it matches the artifact
+USE_ONNX = os.getenv('PREDICT_ONNX', '1') == '1'
+
+
+class MicroBatcher(object):
+    def __init__(self, predict, maxBatch=MAX_BATCH, maxWait=MAX_WAIT):
+        self.predict = predict
+        self.maxBatch = maxBatch
+        self.maxWait = maxWait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    #rows of one request, resolved together with the other requests of the batch
+    def submit(self, X):
+        future = Future()
+        self.pending.put((X, future))
+        return future
+
+    def run(self):
+        while True:
+            items = [self.pending.get()]
+            rows = len(items[0][0])
+            deadline = time.perf_counter() + self.maxWait
+            while rows < self.maxBatch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                rows += len(items[-1][0])
+
+            try:
+                predictions = self.predict(np.concatenate([x for x,_ in items]))
+            except Exception as e:
+                for _,future in items:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += rows
+            start = 0
+            for X,future in items:
+                future.set_result(predictions[start:start + len(X)])
+                start += len(X)
+
+    def stats(self):
+        return {"batches": self.batches, "rows": self.rows, "mean_batch": self.rows / self.batches if self.batches else 0.0}
+
+
+def create_app(path=artifact_path(), maxBatch=MAX_BATCH, maxWait=MAX_WAIT, onnx=USE_ONNX):
+    #artifact, scaler and classes loaded once, before the first request
+    onnxModel = None
+    if onnx:
+        from OnnxExport import artifact_onnx
+        onnxModel = artifact_onnx(path)
+    predictor = TierPredictor(load_artifact(path), onnxModel)
+    batcher = MicroBatcher(predictor.predict, maxBatch, maxWait)
+    app = Flask(__name__)
+
+    @app.post("/predict")
+    def predict():
+        body = request.get_json(force=True, silent=True)
+        if not isinstance(body, dict) or ("instances" not in body and "features" not in body):
+            return jsonify({"error": 'expected {"features": {...}} or {"instances": [...]}'}), 400
+        rows = body["instances"] if "instances" in body else [body["features"]]
+        try:
+            X = predictor.matrix(rows)
+        except (KeyError, ValueError, TypeError) as e:
+            return jsonify({"error": f"bad features: {e}"}), 400
+        #checked here, a malformed matrix would fail the concatenate of the whole micro-batch
+        if X.ndim != 2 or X.shape[1] != len(predictor.columns) or len(X) == 0:
+            return jsonify({"error": f"expected one or more rows of {len(predictor.columns)} features"}), 400
+        try:
+            tiers = batcher.submit(X).result(timeout=RESULT_TIMEOUT)
+        except TimeoutError:
+            return jsonify({"error": "prediction timed out"}), 503
+        return jsonify({"tiers": tiers.tolist()} if "instances" in body else {"tier": str(tiers[0])})
+
+    @app.get("/stats")
+    def stats():
+        return jsonify(batcher.stats())
+
+    app.config["predictor"] = predictor
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(port=PORT, threaded=True)
@@ -8,6 +8,7 @@ class MatchQueryBuilder(object):
 		self.playerQueries = playerQueries
 		self.teamQueries = teamQueries
 		self.queryDependency = {}
+		self.compositeQueries = {}
 		self.setGameMode()
 		self.setQType()
 		self.setDate()
@@ -46,28 +47,42 @@ class MatchQueryBuilder(object):
 		pass
 
 	
-	def buildQuery(self):
+	#a composite aggregation read page by page with compositePages, sources/aggs as in the composite agg body,
+	#path puts it under a nested agg
+	def addCompositeQuery(self,name,sources,aggs=None,path=None,pageSize=1000):
+		self.compositeQueries[name] = {"sources":sources,"aggs":aggs,"path":path,"size":pageSize}
+		pass
+
+	#only limits the query to some of the added queries (by name), None keeps them all
+	def buildQuery(self,only=None):
+		self.complement = {}
+		self.query = {"size":0,"aggs":self.complement}
 		stackRef = self.complement 
 		for qName in self.chainnedQueries:
 			stackRef[qName] = {"filter":self.chainnedQueries[qName], "aggs": {}}
 			stackRef = stackRef[qName]["aggs"]
 
-		stackRef["players_query"] = self.playerQueries.buildQuery()
-		stackRef["teams_query"] = self.teamQueries.buildQuery()
+		if self.playerQueries.hasQueries(only):
+			stackRef["players_query"] = self.playerQueries.buildQuery(only)
+		if self.teamQueries.hasQueries(only):
+			stackRef["teams_query"] = self.teamQueries.buildQuery(only)
 		stackRef["match_query"] = {"filter":{"match_all":{}},"aggs":{}}
 		stackRef = stackRef["match_query"]["aggs"]
 		for qName in self.aditionalQuery:
-			stackRef[qName] = self.aditionalQuery[qName]
+			if only is None or qName in only:
+				stackRef[qName] = self.aditionalQuery[qName]
 
 		return self.query
 
-	def parseQueryResult(self,qResult):
+	def parseQueryResult(self,qResult,only=None):
 		result = {}
 		stackRef = qResult["aggregations"]
 		for qName in self.chainnedQueries:
 			stackRef = stackRef[qName]
 		matchRes = stackRef["match_query"]
 		for qName in self.aditionalQuery:
+			if only is not None and qName not in only:
+				continue
 			result[qName] = {}
 			aux = matchRes[qName]
 			for dep in self.queryDependency[qName]:
@@ -76,10 +91,43 @@ class MatchQueryBuilder(object):
 			result[qName] = aux
 				
 
-		playerRes = self.playerQueries.parseQueryResult(stackRef["players_query"])
-		teamRes = self.teamQueries.parseQueryResult(stackRef["teams_query"])
+		playerRes = self.playerQueries.parseQueryResult(stackRef["players_query"],only) if self.playerQueries.hasQueries(only) else {}
+		teamRes = self.teamQueries.parseQueryResult(stackRef["teams_query"],only) if self.teamQueries.hasQueries(only) else {}
 		return result | playerRes | teamRes
 
+	#composite aggs only accept nested parents, so the match filters move from the filter aggs chain to the query
+	def buildCompositeQuery(self,name,afterKey=None):
+		composite = self.compositeQueries[name]
+		stackRef = {"composite":{"size":composite["size"],"sources":composite["sources"]}}
+		if afterKey is not None:
+			stackRef["composite"]["after"] = afterKey
+		if composite["aggs"] is not None:
+			stackRef["aggs"] = composite["aggs"]
+		aggs = {name:stackRef}
+		if composite["path"] is not None:
+			aggs = {name:{"nested":{"path":composite["path"]},"aggs":aggs}}
+		return {"size":0,"query":{"bool":{"filter":list(self.chainnedQueries.values())}},"aggs":aggs}
+
+	#yields the bucket pages of a composite query following after_key, maxBuckets stops early
+	def compositePages(self,client,name,index="matches",maxBuckets=None):
+		composite = self.compositeQueries[name]
+		afterKey = None
+		total = 0
+		while maxBuckets is None or total < maxBuckets:
+			response = client.search(index=index, body=self.buildCompositeQuery(name,afterKey))
+			result = response["aggregations"][name]
+			if composite["path"] is not None:
+				result = result[name]
+			buckets = result["buckets"]
+			if maxBuckets is not None:
+				buckets = buckets[:maxBuckets - total]
+			if len(buckets) > 0:
+				yield buckets
+			total += len(buckets)
+			afterKey = result.get("after_key")
+			if afterKey is None or len(result["buckets"]) < composite["size"]:
+				break
+
 
 
 
@@ -87,7 +135,8 @@ class MatchPlayerSubQueryBuilder(object):
 	def __init__(self):
 		self.aditionalQuery = {}
 		self.complement = {}
-		self.baseQuery = {"nested": {"path": "info.participants"},"aggs":self.complement}
+		self.path = "info.participants"
+		self.baseQuery = {"nested": {"path": self.path},"aggs":self.complement}
 		self.chainnedQueries = {}
 		self.queriesNames = ["players_winner","players_team"]
 		self.queryDependency = {}
@@ -111,23 +160,31 @@ class MatchPlayerSubQueryBuilder(object):
 		self.queryDependency[name] = dependency
 		pass
 
-	def buildQuery(self):
+	def hasQueries(self,only=None):
+		return len(self.aditionalQuery) > 0 and (only is None or any(qName in only for qName in self.aditionalQuery))
+
+	def buildQuery(self,only=None):
+		self.complement = {}
+		self.baseQuery = {"nested": {"path": self.path},"aggs":self.complement}
 		stackRef = self.complement 
 		for qName in self.chainnedQueries:
 			stackRef[qName] = {"filter":self.chainnedQueries[qName], "aggs": {}}
 			stackRef = stackRef[qName]["aggs"]
 
 		for qName in self.aditionalQuery:
-			stackRef[qName] = self.aditionalQuery[qName] 
+			if only is None or qName in only:
+				stackRef[qName] = self.aditionalQuery[qName] 
 		return self.baseQuery
 
-	def parseQueryResult(self,qResult):
+	def parseQueryResult(self,qResult,only=None):
 		result = {}
 		stackRef = qResult
 		for qName in self.chainnedQueries:
 			stackRef = stackRef[qName]
 
 		for qName in self.aditionalQuery:
+			if only is not None and qName not in only:
+				continue
 			result[qName] = {}
 			aux = stackRef[qName]
 			for dep in self.queryDependency[qName]:
@@ -145,7 +202,8 @@ class MatchTeamSubQueryBuilder(object):
 		self.chainnedQueries = {}
 		self.complement = {}
 		self.queryDependency = {}
-		self.baseQuery = {"nested": {"path": "info.teams"},"aggs":self.complement}
+		self.path = "info.teams"
+		self.baseQuery = {"nested": {"path": self.path},"aggs":self.complement}
 		self.queriesNames = ["team_winner","team_color"]
 		self.setWinner()
 		self.setTeam()
@@ -167,23 +225,31 @@ class MatchTeamSubQueryBuilder(object):
 		self.queryDependency[name] = dependency
 		pass
 
-	def buildQuery(self):
+	def hasQueries(self,only=None):
+		return len(self.aditionalQuery) > 0 and (only is None or any(qName in only for qName in self.aditionalQuery))
+
+	def buildQuery(self,only=None):
+		self.complement = {}
+		self.baseQuery = {"nested": {"path": self.path},"aggs":self.complement}
 		stackRef = self.complement 
 		for qName in self.chainnedQueries:
 			stackRef[qName] = {"filter":self.chainnedQueries[qName], "aggs": {}}
 			stackRef = stackRef[qName]["aggs"]
 
 		for qName in self.aditionalQuery:
-			stackRef[qName] = self.aditionalQuery[qName] 
+			if only is None or qName in only:
+				stackRef[qName] = self.aditionalQuery[qName] 
 		return self.baseQuery
 
-	def parseQueryResult(self,qResult):
+	def parseQueryResult(self,qResult,only=None):
 		result = {}
 		stackRef = qResult
 		for qName in self.chainnedQueries:
 			stackRef = stackRef[qName]
 
 		for qName in self.aditionalQuery:
+			if only is not None and qName not in only:
+				continue
 			result[qName] = {}
 			aux = stackRef[qName]
 			for dep in self.queryDependency[qName]:
@@ -0,0 +1,134 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+#hashable key from query arguments, lists are order independent (tuples such as date ranges keep their order)
+def normalize_key(**queryArgs):
+    key = []
+    for name in sorted(queryArgs):
+        value = queryArgs[name]
+        if isinstance(value, (list, set)):
+            value = tuple(sorted(value, key=str))
+        key.append((name, value))
+    return tuple(key)
+
+
+#In-process LRU cache with a TTL and hit/miss counters.
+#With sharedDir set, entries are also pickled to that directory so several processes (gunicorn workers) share hits,
+#the files' mtime is used as the shared LRU order.
+class QueryCache(object):
+    def __init__(self, maxSize=128, ttl=300, sharedDir=None):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.sharedDir = sharedDir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.sharedHits = 0
+        self.misses = 0
+        if sharedDir is not None:
+            os.makedirs(sharedDir, exist_ok=True)
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self.entries[key]
+
+        found, expires, value = self.shared_get(key, now)
+        with self.lock:
+            if found:
+                self.sharedHits += 1
+                self.local_put(key, expires, value)
+                return True, value
+            self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        expires = time.time() + self.ttl
+        with self.lock:
+            self.local_put(key, expires, value)
+        self.shared_put(key, expires, value)
+
+    def local_put(self, key, expires, value):
+        self.entries[key] = (expires, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.sharedHits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "shared_hits": self.sharedHits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.sharedHits) / requests if requests else 0.0,
+            }
+
+    def shared_path(self, key):
+        return os.path.join(self.sharedDir, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def shared_get(self, key, now):
+        if self.sharedDir is None:
+            return False, None, None
+        path = self.shared_path(key)
+        try:
+            with open(path, "rb") as f:
+                storedKey, expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None, None
+
+        if storedKey != key or expires <= now:
+            return False, None, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, expires, value
+
+    def shared_put(self, key, expires, value):
+        if self.sharedDir is None:
+            return
+        path = self.shared_path(key)
+        tmpPath = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmpPath, "wb") as f:
+            pickle.dump((key, expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, path)
+        self.shared_prune()
+
+    def shared_prune(self):
+        files = []
+        for entry in os.scandir(self.sharedDir):
+            if entry.name.endswith(".pkl"):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        files.sort()
+        for _,path in files[:max(len(files) - self.maxSize, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from operator import itemgetter
+from WorkerPool import ordered_pool_map
+
+#(ranks DataFrame column, ranks _source field)
+RANKS_FIELDS = [("Summoner Id","summonerId"),("Tier","tier"),("Rank","rank"),("Wins","wins"),("Loss","losses")]
+
+
+def read_ranks_slice(client, pitId, sliceId, slices, queueType, pageSize, keepAlive):
+    getter = itemgetter(*[x for _,x in RANKS_FIELDS])
+    cols = [[] for _ in RANKS_FIELDS]
+
+    body = {
+        "size": pageSize,
+        "query": {"bool": {"filter": {"match": {"queueType": queueType}}}},
+        "_source": [x for _,x in RANKS_FIELDS],
+        "pit": {"id": pitId, "keep_alive": keepAlive},
+        "sort": [{"summonerId.keyword": "asc"}],
+        "track_total_hits": False,
+    }
+    if slices > 1:
+        body["slice"] = {"id": sliceId, "max": slices}
+
+    while True:
+        response = client.search(body=body, filter_path=["hits.hits._source","hits.hits.sort"])
+        hits = response.get("hits", {}).get("hits", [])
+        if not hits:
+            break
+
+        #one pass over the page, then transposed into the columns
+        for col,values in zip(cols, zip(*[getter(hit["_source"]) for hit in hits])):
+            col.extend(values)
+
+        if len(hits) < pageSize:
+            break
+        body["search_after"] = hits[-1]["sort"]
+
+    return cols
+
+
+#point in time + search_after, split in slices that are read in parallel
+def read_ranks(client, index="ranks", queueType="ranked_solo_5x5", slices=4, pageSize=10000, keepAlive="5m"):
+    pitId = client.create_pit(index=index, keep_alive=keepAlive)["pit_id"]
+    try:
+        sliceCols = list(ordered_pool_map(lambda sliceId: read_ranks_slice(client, pitId, sliceId, slices, queueType, pageSize, keepAlive), range(slices), slices))
+    finally:
+        client.delete_pit(body={"pit_id": [pitId]})
+
+    data = {}
+    for i,(name,_) in enumerate(RANKS_FIELDS):
+        data[name] = np.concatenate([np.asarray(x[i], dtype=object) for x in sliceCols]) if sliceCols else np.array([], dtype=object)
+    data["Wins"] = data["Wins"].astype(np.int64)
+    data["Loss"] = data["Loss"].astype(np.int64)
+    return pd.DataFrame.from_dict(data)
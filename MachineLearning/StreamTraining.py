@@ -0,0 +1,160 @@
+import os
+import time
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score,classification_report
+from DataSet import DATA_DIR, TIERS, iter_dataset
+from BenchmarkRunner import BENCH_DIR, SCHEMA_VERSION, summarize, write_result, peak_rss_mb, cpu_count
+
+#Out-of-core training of the tier classifiers: the train split is read chunk by chunk (scaler and class counts
+#in a first pass), fed to partial_fit estimators for EPOCHS passes or to an XGBoost external memory DMatrix,
+#and the test split is predicted chunk by chunk. Memory is bounded by CHUNK_SIZE rows plus the label vectors.
+CHUNK_SIZE = 100000
+EPOCHS = 5
+PLATFORM = "local_cpu"
+XGB_CACHE_DIR = os.path.join(DATA_DIR, "cache", "xgb")
+#labels encoded like LabelEncoder does on the full ladder
+CLASSES = np.array(sorted(TIERS))
+
+
+def chunk_arrays(chunk):
+    tiers = chunk.pop("Tier").astype(str).to_numpy()
+    y = np.searchsorted(CLASSES, tiers)
+    #searchsorted puts an unknown tier (or a "nan" of an unlabeled row) between two classes or past the last one
+    unknown = (y == len(CLASSES)) | (CLASSES[np.minimum(y, len(CLASSES) - 1)] != tiers)
+    if unknown.any():
+        raise ValueError(f"unknown tiers {sorted(set(tiers[unknown]))}")
+    return chunk.to_numpy(dtype=np.float32), y
+
+
+#first pass: streaming mean/variance and the class counts for the balanced sample weights
+def fit_scaler(trainName, dataDir, chunkSize):
+    scaler = StandardScaler()
+    counts = np.zeros(len(CLASSES), dtype=np.int64)
+    for chunk in iter_dataset(trainName, dataDir, chunkSize):
+        X, y = chunk_arrays(chunk)
+        scaler.partial_fit(X)
+        counts += np.bincount(y, minlength=len(CLASSES))
+    #class_weight="balanced" of the in-memory models, partial_fit only takes it as sample weights
+    weights = counts.sum() / (len(CLASSES) * np.maximum(counts, 1))
+    return scaler, weights
+
+
+def scaled_chunks(name, dataDir, chunkSize, scaler):
+    for chunk in iter_dataset(name, dataDir, chunkSize):
+        X, y = chunk_arrays(chunk)
+        yield scaler.transform(X), y
+
+
+def train_partial(model, trainName, dataDir, chunkSize, scaler, weights, epochs, seed=42):
+    rng = np.random.default_rng(seed)
+    rows = 0
+    for _ in range(epochs):
+        for X, y in scaled_chunks(trainName, dataDir, chunkSize, scaler):
+            order = rng.permutation(len(y))
+            model.partial_fit(X[order], y[order], classes=np.arange(len(CLASSES)), sample_weight=weights[y[order]])
+            rows += len(y)
+    return model, rows
+
+
+def train_xgboost(trainName, dataDir, chunkSize, scaler, weights, maxDepth=6, rounds=100, threads=None):
+    import xgboost
+
+    #chunks handed to XGBoost one at a time, cached in its external memory pages under XGB_CACHE_DIR
+    class ChunkIter(xgboost.DataIter):
+        def __init__(self):
+            self.chunks = None
+            self.rows = 0
+            super().__init__(cache_prefix=os.path.join(XGB_CACHE_DIR, "train"))
+            self.reset()
+
+        def next(self, input_data):
+            X, y = next(self.chunks, (None, None))
+            if X is None:
+                return False
+            input_data(data=X, label=y, weight=weights[y])
+            self.rows += len(y)
+            return True
+
+        def reset(self):
+            self.chunks = scaled_chunks(trainName, dataDir, chunkSize, scaler)
+
+    os.makedirs(XGB_CACHE_DIR, exist_ok=True)
+    chunkIter = ChunkIter()
+    dtrain = xgboost.DMatrix(chunkIter)
+    params = {"objective": "multi:softprob", "num_class": len(CLASSES), "tree_method": "hist", "max_depth": maxDepth, "seed": 42}
+    if threads is not None:
+        params["nthread"] = threads
+    booster = xgboost.train(params, dtrain, num_boost_round=rounds)
+    return booster, chunkIter.rows
+
+
+def predict_chunks(predict, testName, dataDir, chunkSize, scaler):
+    yTrue = []
+    yPred = []
+    for X, y in scaled_chunks(testName, dataDir, chunkSize, scaler):
+        yTrue.append(y)
+        yPred.append(predict(X))
+    return np.concatenate(yTrue), np.concatenate(yPred)
+
+
+#(name, train(scaler, weights) -> (model, rows seen), predict(model, X) -> labels)
+def stream_models(trainName, dataDir, chunkSize, epochs):
+    models = [
+        ("LRStream", lambda scaler, weights: train_partial(SGDClassifier(loss="log_loss", random_state=42), trainName, dataDir, chunkSize, scaler, weights, epochs),
+            lambda model, X: model.predict(X)),
+        ("SVMStream", lambda scaler, weights: train_partial(SGDClassifier(loss="hinge", random_state=42), trainName, dataDir, chunkSize, scaler, weights, epochs),
+            lambda model, X: model.predict(X)),
+    ]
+    try:
+        import xgboost
+        models.append(("XGBoost6Stream", lambda scaler, weights: train_xgboost(trainName, dataDir, chunkSize, scaler, weights),
+            lambda model, X: model.predict(xgboost.DMatrix(X)).argmax(axis=1)))
+    except ImportError:
+        print("xgboost not available, XGBoost6Stream skipped")
+    return models
+
+
+def run_streaming(trainName="trainSplit", testName="testSplit", dataDir=DATA_DIR, chunkSize=CHUNK_SIZE, epochs=EPOCHS, platform=PLATFORM, outDir=BENCH_DIR):
+    os.makedirs(outDir, exist_ok=True)
+    start = time.perf_counter()
+    scaler, weights = fit_scaler(trainName, dataDir, chunkSize)
+    scalerTime = time.perf_counter() - start
+
+    results = {}
+    for name,train,predict in stream_models(trainName, dataDir, chunkSize, epochs):
+        start = time.perf_counter()
+        model, trainRows = train(scaler, weights)
+        trained = time.perf_counter()
+        yTrue, yPred = predict_chunks(lambda X: predict(model, X), testName, dataDir, chunkSize, scaler)
+        stop = time.perf_counter()
+
+        values = {
+            "schema_version": SCHEMA_VERSION,
+            "model": name,
+            "platform": platform,
+            "backend": "stream",
+            "trials": 1,
+            "warmup": 0,
+            "train_time": summarize([trained - start]),
+            "predict_time": summarize([stop - trained]),
+            "scaler_time": scalerTime,
+            "chunk_size": chunkSize,
+            "epochs": epochs,
+            "train_rows_per_s": trainRows / (trained - start),
+            "predict_rows_per_s": len(yTrue) / (stop - trained),
+            "peak_rss_mb": peak_rss_mb(),
+            "cpu_count": cpu_count(),
+            "metrics": classification_report(yTrue, yPred, output_dict=True,target_names=CLASSES, labels=list(range(len(CLASSES))), zero_division=0),
+            "accuracy": accuracy_score(yTrue, yPred),
+        }
+        write_result(values, os.path.join(outDir, f"{name}_{platform}.json"))
+        results[name] = values
+        print(f"{name}  train {values['train_rows_per_s']:,.0f} rows/s  predict {values['predict_rows_per_s']:,.0f} rows/s"
+              f"  accuracy {values['accuracy']:.4f}  peak RSS {values['peak_rss_mb']:.0f} MiB")
+    return results
+
+
+if __name__ == '__main__':
+    run_streaming()
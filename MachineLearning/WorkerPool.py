@@ -0,0 +1,17 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+#maps fn over items with a thread pool, keeping at most maxInFlight items submitted and not yet consumed,
+#results are yielded in the same order as items
+def ordered_pool_map(fn, items, workers=8, maxInFlight=None):
+    maxInFlight = max(maxInFlight or workers, 1)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= maxInFlight:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fn, item))
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,36 @@
+import time
+import numpy as np
+import DashBoard
+from DashBoard import CHART_GROUPS, OpenSearchBackend, getPandas, get_os_client, CLUSTER_URL, USNAME, PASSWD
+from DuckDBBackend import DuckDBBackend
+
+#per chart group latency of the OpenSearch and the DuckDB backends on identical filters
+#(the DuckDB one reads the Parquet snapshot of MatchRollup.py, refresh it first so both see the same matches)
+TRIALS = 5
+
+FILTERS = [
+    ("no filters", {}),
+    ("classic ranked", {"gameMode": ["classic"], "qType": ["420"]}),
+    ("winners of team 100", {"teamWinner": True, "teamId": [100], "playerWinner": True, "playerTeamId": [100]}),
+    ("weekly duration", {"dateAggs": "1w"}),
+]
+
+backends = [
+    ("opensearch", OpenSearchBackend(get_os_client(CLUSTER_URL,USNAME,PASSWD))),
+    ("duckdb", DuckDBBackend(DashBoard.ROLLUP_DIR, DashBoard.TOTAL_GOLD_INTERVAL, DashBoard.TOTAL_EXP_INTERVAL,
+                             None if DashBoard.COMPOSITE_QUERIES else 40)),
+]
+
+for filterName,queryArgs in FILTERS:
+    print(filterName)
+    for group,queries in CHART_GROUPS.items():
+        line = f"  {group:>10}:"
+        for backendName,backend in backends:
+            getPandas(backend,queries,**queryArgs)
+            times = []
+            for _ in range(TRIALS):
+                start = time.perf_counter()
+                getPandas(backend,queries,**queryArgs)
+                times.append(time.perf_counter() - start)
+            line += f"  {backendName} {np.median(times)*1000:8.1f} ms"
+        print(line)
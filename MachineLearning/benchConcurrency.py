@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from opensearchpy import OpenSearch
+from PlayerAggregation import AVG_FIELDS, BOOL_FIELDS, agg_players_block_query
+from WorkerPool import ordered_pool_map
+
+#local stub of the matches index: answers every block search after a fixed latency
+LATENCY = 0.05
+BLOCKS = 64
+BATCH_SIZE = 50
+CONCURRENCIES = [1,2,4,8,16,32]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        summonerIDs = body["aggs"]["players"]["aggs"]["by_player"]["terms"]["include"]
+
+        bucket = {name:{"value":1.0} for name,_ in AVG_FIELDS}
+        bucket |= {name:{"buckets":[{"key":1,"doc_count":1}]} for name,_ in BOOL_FIELDS}
+        bucket["roleCounts"] = {"buckets":[{"key":"MIDDLE","doc_count":2}]}
+        buckets = [dict(bucket, key=x, doc_count=2) for x in summonerIDs]
+
+        time.sleep(LATENCY)
+        payload = json.dumps({"aggregations":{"players":{"by_player":{"buckets":buckets}}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+ThreadingHTTPServer.request_queue_size = 128
+server = ThreadingHTTPServer(("127.0.0.1",0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+ranks = pd.DataFrame.from_dict({
+    "Summoner Id": [f"summoner{x}" for x in range(BLOCKS*BATCH_SIZE)],
+    "Tier": "GOLD", "Rank": "I", "Wins": 10, "Loss": 10,
+})
+blocks = [ranks.iloc[start:start + BATCH_SIZE] for start in range(0, len(ranks.index), BATCH_SIZE)]
+
+for concurrency in CONCURRENCIES:
+    client = OpenSearch(hosts=[f"http://127.0.0.1:{server.server_port}"], pool_maxsize=concurrency)
+
+    start = time.perf_counter()
+    results = list(ordered_pool_map(lambda block: agg_players_block_query(client, block, 2000), blocks, concurrency, 2*concurrency))
+    stop = time.perf_counter()
+
+    ids = [values[0] for blockRes in results for _,values in blockRes]
+    assert ids == list(ranks["Summoner Id"]), "row order not preserved"
+
+    print(f"concurrency {concurrency:>2}: {len(blocks)/(stop-start):8.1f} searches/s  {len(ids)/(stop-start):10.1f} summoners/s")
+
+server.shutdown()
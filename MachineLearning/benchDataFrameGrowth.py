@@ -0,0 +1,32 @@
+import time
+import pandas as pd
+from PlayerAggregation import COLUMNS
+
+#per-row cost of growing the aggPlayers frame: df.loc appends versus records turned into a frame once
+LOC_SIZES = [1000,2000,4000,8000]
+RECORD_SIZES = [10000,100000,1000000]
+
+values = ["summoner", "GOLD"] + [float(x) for x in range(len(COLUMNS) - 2)]
+
+
+def loc_append(n):
+    df = pd.DataFrame(columns=COLUMNS)
+    for _ in range(n):
+        df.loc[len(df.index)] = values
+    return df
+
+
+def records(n):
+    rows = []
+    for _ in range(n):
+        rows.append(list(values))
+    return pd.DataFrame.from_records(rows, columns=COLUMNS)
+
+
+for name,fn,sizes in [("df.loc append",loc_append,LOC_SIZES),("records",records,RECORD_SIZES)]:
+    for n in sizes:
+        start = time.perf_counter()
+        df = fn(n)
+        stop = time.perf_counter()
+        assert len(df.index) == n
+        print(f"{name:>14} {n:>8} rows: {stop-start:8.2f}s  {(stop-start)/n*1e6:8.2f} us/row")
@@ -0,0 +1,25 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from PlayerAggregation import COLUMNS
+from DataSet import TIERS, write_dataset, read_dataset, dataset_path
+
+#load time and memory of a split stored as CSV versus the typed Parquet dataset
+ROWS = 300000
+
+rng = np.random.default_rng(42)
+df = pd.DataFrame(rng.random((ROWS, len(COLUMNS) - 2)), columns=COLUMNS[2:])
+df.insert(0, "Tier", rng.choice(TIERS, ROWS))
+
+with tempfile.TemporaryDirectory() as dataDir:
+    write_dataset(df, "trainSplit", dataDir, exportCSV=True)
+
+    for name,load in [("csv", lambda: pd.read_csv(dataset_path("trainSplit", dataDir, "csv"), index_col=0)),
+                      ("parquet", lambda: read_dataset("trainSplit", dataDir))]:
+        start = time.perf_counter()
+        loaded = load()
+        stop = time.perf_counter()
+        size = os.path.getsize(dataset_path("trainSplit", dataDir, name))
+        print(f"{name:>8}: load {stop-start:6.2f}s  memory {loaded.memory_usage(deep=True).sum()/2**20:7.1f} MiB  file {size/2**20:7.1f} MiB")
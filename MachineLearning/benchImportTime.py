@@ -0,0 +1,52 @@
+import sys
+import time
+import subprocess
+import numpy as np
+
+#import cost of DashBoard (what every gunicorn worker and test pays before serving),
+#python -X importtime for the per module breakdown plus the wall time of the whole interpreter start.
+#The eager baseline also imports the modules DashBoard now defers to first use, the import cost it had when
+#they were imported at the top (without the startup queries and EDA images, which need the cluster and the data)
+MODULE = "DashBoard"
+DEFERRED = ["opensearchpy", "DuckDBBackend", "PIL.Image"]
+RUNS = 5
+TOP = 15
+
+
+def importtime(module, extra=()):
+    start = time.perf_counter()
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join([module, *extra])}"], capture_output=True, text=True, check=True).stderr
+    wall = time.perf_counter() - start
+
+    rows = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        selfUs, cumulativeUs, name = line[len("import time:"):].split("|")
+        rows[name.strip()] = (int(selfUs), int(cumulativeUs))
+        #nested imports are indented, the top level ones add up to the whole import
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulativeUs)
+    return wall, total / 1e6, rows
+
+
+def measure(extra=()):
+    walls = []
+    totals = []
+    for _ in range(RUNS):
+        wall, total, rows = importtime(MODULE, extra)
+        walls.append(wall)
+        totals.append(total)
+    return np.median(totals), np.median(walls), rows
+
+
+eagerTotal, eagerWall, _ = measure(DEFERRED)
+total, wall, rows = measure()
+print(f"{'eager baseline':>14}: import {eagerTotal:.3f}s  interpreter wall {eagerWall:.3f}s  (median of {RUNS})")
+print(f"{MODULE:>14}: import {total:.3f}s  interpreter wall {wall:.3f}s  (median of {RUNS})")
+print(f"{'deferred':>14}: {eagerTotal - total:.3f}s import  {eagerWall - wall:.3f}s wall")
+print("slowest top level imports (cumulative) of the last run:")
+topLevel = [(x, y[1]) for x,y in rows.items() if "." not in x and x != MODULE]
+for name,cumulativeUs in sorted(topLevel, key=lambda x: -x[1])[:TOP]:
+    print(f"  {name:>30}: {cumulativeUs/1e3:8.1f} ms")
@@ -0,0 +1,45 @@
+import os
+import time
+import numpy as np
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from FeatureCache import load_features
+from ApproxKNN import HNSWKNeighborsClassifier
+
+#exact KNN against the HNSW index on the test split: predict time, accuracy, weighted F1 and the recall of the
+#approximate neighbour sets (on RECALL_SAMPLE test rows), for every query ef
+EFS = [10, 20, 50, 100, 200]
+N_NEIGHBORS = 5
+RECALL_SAMPLE = 2000
+
+XTrain, XTest, yTrain, yTest, classes = load_features()
+sample = np.random.default_rng(42).choice(len(XTest), min(RECALL_SAMPLE, len(XTest)), replace=False)
+
+exact = KNeighborsClassifier(n_neighbors=N_NEIGHBORS, n_jobs=-1).fit(XTrain, yTrain)
+start = time.perf_counter()
+yPred = exact.predict(XTest)
+exactTime = time.perf_counter() - start
+_, exactIds = exact.kneighbors(XTest[sample])
+
+approx = HNSWKNeighborsClassifier(n_neighbors=N_NEIGHBORS)
+path = approx.index_path(np.asarray(XTrain, dtype=np.float32), np.asarray(yTrain))
+if os.path.exists(path):
+    os.remove(path)
+start = time.perf_counter()
+approx.fit(XTrain, yTrain)
+buildTime = time.perf_counter() - start
+start = time.perf_counter()
+approx.fit(XTrain, yTrain)
+loadTime = time.perf_counter() - start
+print(f"HNSW index: build {buildTime:.2f}s, load {loadTime:.2f}s ({os.path.getsize(path)/2**20:.1f} MiB)")
+
+print(f"{'model':>12} {'predict s':>10} {'us/row':>8} {'accuracy':>9} {'f1':>7} {'recall':>7}")
+print(f"{'exact':>12} {exactTime:10.3f} {exactTime/len(XTest)*1e6:8.1f} {accuracy_score(yTest, yPred):9.4f} {f1_score(yTest, yPred, average='weighted'):7.4f} {1.0:7.3f}")
+for ef in EFS:
+    approx.ef = ef
+    start = time.perf_counter()
+    yPred = approx.predict(XTest)
+    approxTime = time.perf_counter() - start
+    _, ids = approx.kneighbors(XTest[sample])
+    recall = np.mean([len(np.intersect1d(x, y)) / N_NEIGHBORS for x,y in zip(ids, exactIds)])
+    print(f"{'ef ' + str(ef):>12} {approxTime:10.3f} {approxTime/len(XTest)*1e6:8.1f} {accuracy_score(yTest, yPred):9.4f} {f1_score(yTest, yPred, average='weighted'):7.4f} {recall:7.3f}")
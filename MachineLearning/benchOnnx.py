@@ -0,0 +1,54 @@
+import os
+import time
+import numpy as np
+from FeatureCache import load_features
+from BenchmarkRunner import SklearnBackend, XGBoostBackend
+from OnnxExport import export_onnx, OnnxPredictor
+
+#native predict against the ONNX Runtime export of the tree models at batch sizes 1, 64 and the whole test split:
+#median latency per batch and rows/s, plus the share of identical predictions
+ONNX_DIR = os.path.join("models", "onnx")
+BATCH_SIZES = [1, 64, None]
+#batches timed for the small sizes, the full test split is predicted REPEATS times
+BATCHES = 300
+REPEATS = 3
+
+XTrain, XTest, yTrain, yTest, classes = load_features()
+XTest = np.ascontiguousarray(XTest, dtype=np.float32)
+
+#same estimators as the CPU benchmark, threads left to each library
+backends = [x for x in [XGBoostBackend(), SklearnBackend()] if x.available()]
+MODELS = [x for backend in backends for x in backend.models() if x[0] in ["XGBoost6", "XGBoost10", "RandForest"]]
+
+
+def time_batches(predict, batchSize):
+    if batchSize is None:
+        batches = [XTest] * REPEATS
+    else:
+        starts = np.random.default_rng(42).integers(0, len(XTest) - batchSize, BATCHES)
+        batches = [XTest[x:x + batchSize] for x in starts]
+    predict(batches[0])
+    times = []
+    for batch in batches:
+        start = time.perf_counter()
+        predict(batch)
+        times.append(time.perf_counter() - start)
+    return np.median(times), sum(len(x) for x in batches) / sum(times)
+
+
+for name,factory in MODELS:
+    model = factory(None).fit(XTrain, yTrain)
+    start = time.perf_counter()
+    path = export_onnx(model, XTest.shape[1], os.path.join(ONNX_DIR, f"{name}.onnx"))
+    print(f"{name}: exported in {time.perf_counter() - start:.1f}s ({os.path.getsize(path)/2**20:.1f} MiB)")
+    onnxModel = OnnxPredictor(path)
+
+    agreement = np.mean(onnxModel.predict(XTest) == model.predict(XTest))
+    for batchSize in BATCH_SIZES:
+        label = "full" if batchSize is None else str(batchSize)
+        line = f"  batch {label:>5}:"
+        for pathName,predict in [("native", model.predict), ("onnx", onnxModel.predict)]:
+            latency, throughput = time_batches(predict, batchSize)
+            line += f"  {pathName} {latency*1000:9.3f} ms {throughput:12,.0f} rows/s"
+        print(line)
+    print(f"  same predictions: {agreement:.4%}")
@@ -0,0 +1,19 @@
+from BenchmarkRunner import SklearnBackend, ScalableSVMBackend, run_benchmark
+
+#exact SVC against its approximations on the same split: train/predict time, accuracy and weighted F1,
+#with the loss of each approximation relative to the exact model
+PLATFORM = "local_cpu"
+TRIALS = 3
+#the exact SVC takes minutes per fit on the full ladder, its trials stop after this many seconds
+TIME_BUDGET = 600
+
+results = run_benchmark([SklearnBackend(), ScalableSVMBackend()], PLATFORM, trials=TRIALS, timeBudget=TIME_BUDGET,
+                        models=["SVM","SVMNystroem","SVMRBFSampler","SVMBagged"])
+
+exact = results["SVM"]
+print(f"{'model':>14} {'train s':>9} {'predict s':>9} {'accuracy':>9} {'f1':>7} {'speedup':>8} {'d acc':>7} {'d f1':>7}")
+for name,values in results.items():
+    f1 = values["metrics"]["weighted avg"]["f1-score"]
+    exactF1 = exact["metrics"]["weighted avg"]["f1-score"]
+    print(f"{name:>14} {values['train_time']['median']:9.2f} {values['predict_time']['median']:9.2f} {values['accuracy']:9.4f} {f1:7.4f}"
+          f" {exact['train_time']['median']/values['train_time']['median']:7.1f}x {values['accuracy']-exact['accuracy']:+7.4f} {f1-exactF1:+7.4f}")
@@ -0,0 +1,52 @@
+import json
+import time
+import logging
+import threading
+import http.client
+import numpy as np
+from werkzeug.serving import make_server
+from DataSet import read_dataset
+from ModelArtifact import artifact_path
+from PredictionService import create_app, MAX_BATCH, MAX_WAIT
+
+#local load generator for PredictionService: CONCURRENCY clients sending single summoner requests over keep-alive
+#connections, p50/p99 latency and throughput without micro-batching (batches of 1) and with it
+REQUESTS = 2000
+CONCURRENCIES = [1,8,32]
+CONFIGS = [("no batching", 1, 0.0), ("micro-batching", MAX_BATCH, MAX_WAIT)]
+
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+rows = read_dataset("testSplit").drop(columns=["Tier"]).head(REQUESTS)
+bodies = [json.dumps({"features": x}).encode() for x in rows.to_dict(orient="records")]
+
+
+def client(port, bodies, latencies):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    for body in bodies:
+        start = time.perf_counter()
+        connection.request("POST", "/predict", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        assert response.status == 200, response.status
+    connection.close()
+
+
+for name,maxBatch,maxWait in CONFIGS:
+    app = create_app(artifact_path(), maxBatch, maxWait)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    for concurrency in CONCURRENCIES:
+        latencies = [[] for _ in range(concurrency)]
+        threads = [threading.Thread(target=client, args=(server.server_port, bodies[i::concurrency], latencies[i])) for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        latencies = np.concatenate(latencies) * 1000
+        print(f"{name:>15} concurrency {concurrency:>2}: p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):7.2f} ms  {len(latencies)/wall:8.1f} req/s")
+    server.shutdown()